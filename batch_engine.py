@@ -0,0 +1,251 @@
+import numpy as np
+
+from engine import PieceSource, UNIFORM, ROTATIONS, NUM_OF_BLOCK_TYPES, GAME_WIDTH, GAME_HEIGHT, START_X, START_Y, FULL_ROW
+from engine import LEFT, RIGHT, ROTATE_CW, ROTATE_CCW, SOFT_DROP, HARD_DROP, HOLD, GRAVITY
+
+MAX_BLOCK_SIZE = 4
+NO_BLOCK = -1
+
+# ROTATIONS as arrays indexed by [block_type, rotation], with the row masks padded to MAX_BLOCK_SIZE rows
+MASKS = np.zeros((NUM_OF_BLOCK_TYPES, 4, MAX_BLOCK_SIZE), dtype=np.int32)
+WIDTHS = np.zeros((NUM_OF_BLOCK_TYPES, 4), dtype=np.int32)
+HEIGHTS = np.zeros((NUM_OF_BLOCK_TYPES, 4), dtype=np.int32)
+for block_type, orientations in enumerate(ROTATIONS):
+    for rotation, orientation in enumerate(orientations):
+        MASKS[block_type, rotation, :orientation.height] = orientation.masks
+        WIDTHS[block_type, rotation] = orientation.width
+        HEIGHTS[block_type, rotation] = orientation.height
+ROW_OFFSETS = np.arange(MAX_BLOCK_SIZE)
+
+
+class BatchEngine:
+    def __init__(self, num_games, seed=0, mode=UNIFORM):
+        """ Initializes the BatchEngine Object
+        Many independent games following the rules of Engine, stepped together with NumPy array operations.
+        Game i draws its blocks from PieceSource(seed + i, mode), so given the same actions it plays
+        exactly like Engine(PieceSource(seed + i, mode)).
+
+        BatchEngine Object will have:
+        - the row bitmasks of the locked blocks of every game as blocks, an (num_games, GAME_HEIGHT) array
+        - the type, rotation and x/y position of the current block of every game
+        - the type of the next block and of the block on hold (NO_BLOCK if none) of every game
+        - the score, number of lines cleared, gravity interval, holdability and game over flag of every game
+
+        Args:
+            num_games (int): the number of games in the batch
+            seed (int, optional): the seed of the blocks of the first game. Defaults to 0.
+            mode (str, optional): the mode of the PieceSources. Defaults to UNIFORM.
+        """
+        self.num_games = num_games
+        self.piece_sources = [PieceSource(seed + i, mode) for i in range(num_games)]
+        self.blocks = np.zeros((num_games, GAME_HEIGHT), dtype=np.int32)
+        self.block_type = np.zeros(num_games, dtype=np.int32)
+        self.rotation = np.zeros(num_games, dtype=np.int32)
+        self.x = np.full(num_games, START_X, dtype=np.int32)
+        self.y = np.full(num_games, START_Y, dtype=np.int32)
+        self.next_type = np.array([source.next_type() for source in self.piece_sources], dtype=np.int32)
+        self.held_type = np.full(num_games, NO_BLOCK, dtype=np.int32)
+        self.held_rotation = np.zeros(num_games, dtype=np.int32)
+        self.can_hold = np.zeros(num_games, dtype=bool)
+
+        self.score = np.zeros(num_games, dtype=np.int64)
+        self.lines_cleared = np.zeros(num_games, dtype=np.int64)
+        self.timing = np.full(num_games, 0.5)
+        self.over = np.zeros(num_games, dtype=bool)
+
+
+    def start(self):
+        """ Starts every game by bringing the first block into the board
+        """
+        self.get_new_blocks(np.arange(self.num_games))
+
+
+    def check_collision(self, games, block_type, rotation, new_x, new_y):
+        """ Checks, for each given game, if a block would collide with the locked blocks or leave the board
+
+        Args:
+            games (array of ints): the indices of the games
+            block_type (array of ints): the type of the block in each game
+            rotation (array of ints): the rotation of the block in each game
+            new_x (array of ints): the column of the block in each game
+            new_y (array of ints): the row of the block in each game
+
+        Returns:
+            array of bools: True for every game where the block collides
+        """
+        out = (new_x < 0) | (new_y < 0) | (new_x + WIDTHS[block_type, rotation] > GAME_WIDTH) | \
+              (new_y + HEIGHTS[block_type, rotation] > GAME_HEIGHT)
+        rows = np.minimum(np.maximum(new_y, 0)[:, None] + ROW_OFFSETS, GAME_HEIGHT - 1)
+        masks = MASKS[block_type, rotation] << np.maximum(new_x, 0)[:, None]
+        return out | (self.blocks[games[:, None], rows] & masks).any(axis=1)
+
+
+    def step(self, actions):
+        """ Applies one action to every game that is not over
+
+        Args:
+            actions (array of ints): the action of each game, one of the actions of the engine
+
+        Returns:
+            BatchEngine: itself, so the arrays can be read straight after stepping
+        """
+        actions = np.asarray(actions)
+        active = ~self.over
+        self.move(np.flatnonzero(active & (actions == LEFT)), dx=-1)
+        self.move(np.flatnonzero(active & (actions == RIGHT)), dx=1)
+        self.rotate(np.flatnonzero(active & (actions == ROTATE_CW)), -1)
+        self.rotate(np.flatnonzero(active & (actions == ROTATE_CCW)), 1)
+        self.move(np.flatnonzero(active & (actions == SOFT_DROP)), dy=1)
+        self.hard_drop(np.flatnonzero(active & (actions == HARD_DROP)))
+        self.hold_blocks(np.flatnonzero(active & (actions == HOLD)))
+        self.gravity(np.flatnonzero(active & (actions == GRAVITY)))
+        return self
+
+
+    def move(self, games, dx=0, dy=0):
+        """ Moves the current block of the given games, where it does not collide
+
+        Args:
+            games (array of ints): the indices of the games
+            dx (int, optional): the number of columns to move right. Defaults to 0.
+            dy (int, optional): the number of rows to move down. Defaults to 0.
+
+        Returns:
+            array of bools: True for every game where the block could not move
+        """
+        new_x, new_y = self.x[games] + dx, self.y[games] + dy
+        blocked = self.check_collision(games, self.block_type[games], self.rotation[games], new_x, new_y)
+        moved = games[~blocked]
+        self.x[moved] = new_x[~blocked]
+        self.y[moved] = new_y[~blocked]
+        return blocked
+
+
+    def rotate(self, games, turns):
+        """ Rotates the current block of the given games, where the rotated block does not collide
+
+        Args:
+            games (array of ints): the indices of the games
+            turns (int): 1 to rotate anticlockwise, -1 to rotate clockwise
+        """
+        new_rotation = (self.rotation[games] + turns) % 4
+        blocked = self.check_collision(games, self.block_type[games], new_rotation, self.x[games], self.y[games])
+        self.rotation[games[~blocked]] = new_rotation[~blocked]
+
+
+    def gravity(self, games):
+        """ Moves the current block of the given games down 1 unit, locking the blocks that cannot move down
+
+        Args:
+            games (array of ints): the indices of the games
+        """
+        blocked = self.move(games, dy=1)
+        self.lock_blocks(games[blocked])
+
+
+    def hard_drop(self, games):
+        """ Drops the current block of the given games straight down and locks it
+
+        Args:
+            games (array of ints): the indices of the games
+        """
+        falling = games
+        while len(falling):
+            blocked = self.move(falling, dy=1)
+            falling = falling[~blocked]
+        self.lock_blocks(games)
+
+
+    def lock_blocks(self, games):
+        """ Saves the current block of the given games into their locked blocks, clears their full rows
+        and brings in their next block
+
+        Args:
+            games (array of ints): the indices of the games
+        """
+        if not len(games):
+            return
+        block_type, rotation = self.block_type[games], self.rotation[games]
+        masks = MASKS[block_type, rotation] << self.x[games][:, None]
+        heights = HEIGHTS[block_type, rotation]
+        for height in range(MAX_BLOCK_SIZE):
+            inside = height < heights
+            self.blocks[games[inside], self.y[games][inside] + height] |= masks[inside, height]
+        self.clear_lines(games)
+        self.get_new_blocks(games)
+
+
+    def clear_lines(self, games):
+        """ Clears the full rows of the given games, moving the rows above them down, and updates their score
+
+        Args:
+            games (array of ints): the indices of the games
+        """
+        rows = self.blocks[games]
+        full = rows == FULL_ROW
+        lines = full.sum(axis=1)
+        if not lines.any():
+            return
+        rows[full] = 0
+        # a stable sort on "not full" moves the emptied rows to the top and keeps the others in order
+        self.blocks[games] = np.take_along_axis(rows, np.argsort(~full, axis=1, kind="stable"), axis=1)
+        self.score[games] += 10 * lines
+        self.lines_cleared[games] += lines
+        speed_up = games[(lines > 0) & ((self.lines_cleared[games] + 1) % 11 == 0)]
+        self.timing[speed_up] /= 1.4
+
+
+    def get_new_blocks(self, games):
+        """ Makes the next block the current block of the given games and draws their new next block.
+        Ends the games where the new block has no space at the top of the board.
+
+        Args:
+            games (array of ints): the indices of the games
+        """
+        self.block_type[games] = self.next_type[games]
+        self.rotation[games] = 0
+        self.next_type[games] = [self.piece_sources[game].next_type() for game in games]
+        self.spawn(games)
+
+
+    def spawn(self, games):
+        """ Puts the current block of the given games at the top of the board and ends the games where it collides
+
+        Args:
+            games (array of ints): the indices of the games
+        """
+        self.x[games] = START_X
+        self.y[games] = START_Y
+        self.can_hold[games] = True
+        self.over[games] |= self.check_collision(games, self.block_type[games], self.rotation[games], self.x[games], self.y[games])
+
+
+    def hold_blocks(self, games):
+        """ Moves the current block of the given games to their holding space.
+        Swaps it with the held block if there is one, otherwise brings in the next block.
+
+        Args:
+            games (array of ints): the indices of the games
+        """
+        games = games[self.can_hold[games]]
+        if not len(games):
+            return
+        held_type, held_rotation = self.held_type[games], self.held_rotation[games]
+        self.held_type[games] = self.block_type[games]
+        self.held_rotation[games] = self.rotation[games]
+        empty = held_type == NO_BLOCK
+        swapped = games[~empty]
+        self.block_type[swapped] = held_type[~empty]
+        self.rotation[swapped] = held_rotation[~empty]
+        self.spawn(swapped)
+        self.get_new_blocks(games[empty])
+        self.can_hold[games] = False
+
+
+    def to_matrix(self):
+        """ Unpacks the locked blocks of every game into units
+
+        Returns:
+            array: (num_games, GAME_HEIGHT, GAME_WIDTH) array of 1s and 0s
+        """
+        return (self.blocks[:, :, None] >> np.arange(GAME_WIDTH)) & 1
@@ -0,0 +1,308 @@
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from engine import Engine, Block, PieceSource, Surface, GAME_WIDTH, GAME_HEIGHT, FULL_ROW, EMPTY_ROW, START_X, START_Y
+from curses_tetris import Board
+
+# Number of filled rows at the bottom of each fixture board
+FIXTURES = {"empty": 0,
+            "half_full": GAME_HEIGHT // 2,
+            "topped_out": GAME_HEIGHT - 4}
+FILL_RATE = 0.7
+# A benchmark is reported as a regression when it runs at less than this fraction of the compared ops/sec
+REGRESSION_THRESHOLD = 0.8
+
+
+class FakeWindow:
+    def __init__(self):
+        """ Initializes the FakeWindow Object
+        Stands in for a curses window so the drawing code can be measured without a terminal.
+        Only counts the calls that reach it.
+        """
+        self.writes = 0
+        self.refreshes = 0
+
+
+    def addstr(self, *args):
+        """Counts a string written to the window"""
+        self.writes += 1
+
+
+    def noutrefresh(self):
+        """Counts a staged refresh of the window"""
+        self.refreshes += 1
+
+
+    def refresh(self):
+        """Counts a refresh of the window"""
+        self.refreshes += 1
+
+
+class FakeScreen:
+    def __init__(self):
+        """ Initializes the FakeScreen Object
+        Stands in for the screen of a Board, handing out FakeWindow objects instead of terminal windows.
+        """
+        self.root = FakeWindow()
+
+
+    def subwin(self, height, width, y, x):
+        """Creates a FakeWindow standing in for a part of the screen"""
+        return FakeWindow()
+
+
+    def doupdate(self):
+        """Does nothing, as there is no terminal to update"""
+
+
+def create_rows(filled, seed):
+    """Creates the rows of a reproducible fixture board
+    Every filled row has at least one empty unit, so no line is ever full.
+
+    Args:
+        filled (int): the number of filled rows at the bottom of the board
+        seed (int): the seed the units are picked with
+
+    Returns:
+        list of ints: the row bitmasks of the board
+    """
+    rng = random.Random(seed)
+    rows = [EMPTY_ROW] * GAME_HEIGHT
+    for y in range(GAME_HEIGHT - filled, GAME_HEIGHT):
+        row = sum(1 << x for x in range(GAME_WIDTH) if rng.random() < FILL_RATE)
+        if row == FULL_ROW:
+            row &= ~(1 << rng.randrange(GAME_WIDTH))
+        rows[y] = row
+    return rows
+
+
+def create_engine(rows, seed):
+    """Creates a started game on the given fixture board
+
+    Args:
+        rows (list of ints): the row bitmasks of the locked blocks
+        seed (int): the seed of the block sequence
+
+    Returns:
+        Engine: the game, with its current block at the top of the board
+    """
+    engine = Engine(PieceSource(seed))
+    engine.blocks = tuple(rows)
+    engine.surface = Surface(engine.blocks)
+    engine.next_block = Block(START_X, START_Y, 0)
+    engine.start()
+    return engine
+
+
+def reset_engine(engine, rows, surface, block_type):
+    """Puts a fixture game back into its starting position, for operations that change the board
+
+    Args:
+        engine (Engine): the game to reset
+        rows (tuple of ints): the row bitmasks of the locked blocks
+        surface (Surface): the surface of the rows, copied so it is not measured again on every run
+        block_type (int): the shape of the current block
+    """
+    engine.blocks = rows
+    engine.surface = surface.copy()
+    engine.current_block = Block(START_X, START_Y, block_type)
+    engine.over = False
+
+
+def create_board(engine):
+    """Creates a curses Board that draws on FakeWindow objects instead of the terminal.
+    The board only draws the frames it is given: it stops following the engine, so the engine benchmarks
+    do not also schedule gravity and frames on it.
+
+    Args:
+        engine (Engine): the game to draw
+
+    Returns:
+        Board: the board, without a terminal behind it
+    """
+    board = Board(engine, screen=FakeScreen())
+    engine.unsubscribe(board.on_engine_event)
+    return board
+
+
+def create_benchmarks(rows, seed):
+    """Creates the operations to measure on one fixture board
+
+    Args:
+        rows (list of ints): the row bitmasks of the fixture board
+        seed (int): the seed of the block sequence
+
+    Returns:
+        dict: the name of every benchmark mapped to a function running the operation once
+    """
+    engine = create_engine(rows, seed)
+    block = engine.current_block
+    block_type = block.block_type
+    full_rows = rows.copy()
+    full_rows[-1] = full_rows[-2] = FULL_ROW
+    rows, full_rows = tuple(rows), tuple(full_rows)
+    surface, full_surface = Surface(rows), Surface(full_rows)
+    board = create_board(engine)
+    # the frames drawn when the current block moves one unit left and back
+    frames = []
+    for x in (block.x - 1, block.x):
+        engine.insert_block_into_board(x, block.y)
+        frames.append(engine.get_board())
+
+    def check_collision():
+        engine.check_collision(block.x, block.y + 1)
+
+    def hard_drop():
+        reset_engine(engine, rows, surface, block_type)
+        engine.hard_drop()
+
+    def check_lines():
+        engine.check_lines()
+
+    def clear_lines():
+        reset_engine(engine, full_rows, full_surface, block_type)
+        engine.check_lines(GAME_HEIGHT - 4, GAME_HEIGHT)
+
+    def get_board():
+        engine.get_board()
+
+    def rotate_clockwise():
+        block.rotate_clockwise()
+
+    def rotate_anticlockwise():
+        block.rotate_anticlockwise()
+
+    def update_main_board():
+        frames.reverse()
+        board.update_main_board(frames[0])
+
+    return {"check_collision": check_collision,
+            "hard_drop": hard_drop,
+            "check_lines": check_lines,
+            "clear_lines": clear_lines,
+            "get_board": get_board,
+            "rotate_clockwise": rotate_clockwise,
+            "rotate_anticlockwise": rotate_anticlockwise,
+            "update_main_board": update_main_board}
+
+
+def measure(operation, number):
+    """Measures the speed and the memory allocations of an operation
+
+    Args:
+        operation (callable): runs the operation once
+        number (int): how many times to run it
+
+    Returns:
+        dict: ops_per_sec, ns_per_op, the peak bytes allocated while running and the bytes kept per operation
+    """
+    for _ in range(min(number, 1000)):
+        operation()
+    start = time.perf_counter()
+    for _ in range(number):
+        operation()
+    elapsed = time.perf_counter() - start
+
+    # measured in a separate pass since tracing slows every allocation down
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    for _ in range(number):
+        operation()
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"ops_per_sec": number / elapsed,
+            "ns_per_op": elapsed / number * 1e9,
+            "peak_alloc_bytes": peak - before,
+            "retained_bytes_per_op": (after - before) / number}
+
+
+def run(number, seed):
+    """Runs every benchmark on every fixture board
+
+    Args:
+        number (int): how many times to run each operation
+        seed (int): the seed of the fixture boards and block sequences
+
+    Returns:
+        dict: the environment the benchmarks ran in and the results of every benchmark per fixture
+    """
+    results = {}
+    for fixture, filled in FIXTURES.items():
+        for name, operation in create_benchmarks(create_rows(filled, seed), seed).items():
+            results.setdefault(name, {})[fixture] = measure(operation, number)
+    return {"python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "number": number,
+            "seed": seed,
+            "results": results}
+
+
+def compare(report, baseline):
+    """Finds the benchmarks that got slower than in an earlier report
+
+    Args:
+        report (dict): the report of this run
+        baseline (dict): the report to compare against
+
+    Returns:
+        list of tuples: (name, fixture, ratio) of every regressed benchmark, ratio being new ops/sec over old ops/sec
+    """
+    regressions = []
+    for name, fixtures in report["results"].items():
+        for fixture, result in fixtures.items():
+            old = baseline["results"].get(name, {}).get(fixture)
+            if old is None:
+                continue
+            ratio = result["ops_per_sec"] / old["ops_per_sec"]
+            if ratio < REGRESSION_THRESHOLD:
+                regressions.append((name, fixture, ratio))
+    return regressions
+
+
+def print_report(report):
+    """Prints the results of a report as a table
+
+    Args:
+        report (dict): the report to print
+    """
+    print(f"{'benchmark':<26}{'fixture':<12}{'ops/sec':>14}{'ns/op':>12}{'peak B':>10}{'kept B/op':>11}")
+    for name, fixtures in report["results"].items():
+        for fixture, result in fixtures.items():
+            print(f"{name:<26}{fixture:<12}{result['ops_per_sec']:>14,.0f}{result['ns_per_op']:>12,.0f}"
+                  f"{result['peak_alloc_bytes']:>10,}{result['retained_bytes_per_op']:>11,.1f}")
+
+
+def main():
+    """Runs the benchmarks, saves them as JSON and compares them with an earlier run
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the core board operations")
+    parser.add_argument("--number", type=int, default=20000, help="runs of every operation (default: 20000)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the fixture boards (default: 0)")
+    parser.add_argument("--output", metavar="FILE", help="save the results as JSON to FILE")
+    parser.add_argument("--compare", metavar="FILE", help="fail if slower than the JSON results in FILE")
+    args = parser.parse_args()
+
+    report = run(args.number, args.seed)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(report, json.load(file))
+        for name, fixture, ratio in regressions:
+            print(f"REGRESSION {name} ({fixture}): {ratio:.0%} of the compared ops/sec")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__=="__main__":
+    main()
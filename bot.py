@@ -0,0 +1,431 @@
+import argparse
+import time
+from collections import OrderedDict, namedtuple
+
+from engine import Engine, Block, PieceSource, UNIFORM, BAG, ROTATIONS, GAME_WIDTH, GAME_HEIGHT, START_X, START_Y
+from engine import EMPTY_ROW, FULL_ROW, LEFT, RIGHT, ROTATE_CW, ROTATE_CCW, HARD_DROP, HOLD, GRAVITY
+
+# Weights of the board features, tuned by Yiyuan Lee for a 10 wide board
+WEIGHTS = {"height": -0.510066,
+           "lines": 0.760666,
+           "holes": -0.35663,
+           "bumpiness": -0.184483}
+
+# Rotations of every block type that give a different shape (the O block only has 1, I, S and Z have 2)
+UNIQUE_ROTATIONS = tuple(tuple(rotation for rotation, orientation in enumerate(orientations)
+                               if orientation.masks not in [other.masks for other in orientations[:rotation]])
+                         for orientations in ROTATIONS)
+
+# Number of (board, block) evaluations a Bot remembers by default
+CACHE_SIZE = 100000
+
+# Seconds every action of the bot takes in a game without a display, the time gravity keeps running during
+ACTION_TIME = 0.05
+
+# A final position of a block: whether it is reached by holding first, the block and its rotation,
+# the column and row it lands at, the lines it clears and the evaluation of the resulting board
+Placement = namedtuple("Placement", ["hold", "block_type", "rotation", "x", "y", "lines", "score"])
+
+
+def fits(rows, orientation, x, y):
+    """Checks if a block has space on the board at the given position
+
+    Args:
+        rows (tuple of ints): the row bitmasks of the board
+        orientation (Orientation): the block in its rotation
+        x (int): the column of the left side of the block
+        y (int): the row of the top of the block
+
+    Returns:
+        bool: True if the block is within the board and overlaps no populated unit
+    """
+    if x < 0 or y < 0 or x + orientation.width > GAME_WIDTH or y + orientation.height > GAME_HEIGHT:
+        return False
+    for height, mask in enumerate(orientation.masks):
+        if rows[y + height] & (mask << x):
+            return False
+    return True
+
+
+def place(rows, surface, block_type, rotation, x, y):
+    """Locks a block into a copy of the board and of its Surface and clears the full rows it completes
+
+    Args:
+        rows (tuple of ints): the row bitmasks of the board
+        surface (Surface): the heights and holes of the board
+        block_type (int): the type of the block
+        rotation (int): the rotation of the block
+        x (int): the column of the left side of the block
+        y (int): the row of the top of the block
+
+    Returns:
+        tuple: the row bitmasks of the new board, its Surface and the number of lines cleared
+    """
+    rows = list(rows)
+    lines = []
+    for height, mask in enumerate(ROTATIONS[block_type][rotation].masks):
+        rows[y + height] |= mask << x
+        if rows[y + height] == FULL_ROW:
+            lines.append(y + height)
+    surface = surface.copy()
+    surface.lock(Block(x, y, block_type, rotation))
+    if lines:
+        rows = [EMPTY_ROW] * len(lines) + [row for row in rows if row != FULL_ROW]
+        surface.clear(lines, rows)
+    return tuple(rows), surface, len(lines)
+
+
+def evaluate(surface, lines, weights):
+    """Scores a board with a weighted sum of its aggregate height, cleared lines, holes and bumpiness
+
+    Args:
+        surface (Surface): the heights and holes of the board
+        lines (int): the number of lines cleared to reach the board
+        weights (dict): the weight of every feature
+
+    Returns:
+        float: the score of the board, higher is better
+    """
+    return weights["height"] * surface.aggregate_height() + weights["lines"] * lines + \
+           weights["holes"] * surface.total_holes() + weights["bumpiness"] * surface.bumpiness()
+
+
+class TranspositionCache:
+    def __init__(self, max_size=CACHE_SIZE):
+        """ Initializes the TranspositionCache Object
+        Remembers the evaluation of boards the bot already searched, so the same board and block reached
+        through different placements (or in different moves) is only searched once.
+        Keys are built from the row bitmasks of the board, so hashing a board is hashing 20 ints.
+        The least recently used entries are dropped once the cache is full.
+
+        TranspositionCache Object will have:
+        - the entries, ordered from least to most recently used
+        - the maximum number of entries
+        - the number of hits, misses and dropped entries
+
+        Args:
+            max_size (int, optional): the maximum number of entries. Defaults to CACHE_SIZE.
+        """
+        self.entries = OrderedDict()
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+
+    def get(self, key):
+        """ Looks up an entry and marks it as recently used
+
+        Args:
+            key (tuple): the key of the entry
+
+        Returns:
+            the value of the entry, or None if it is not cached
+        """
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return value
+
+
+    def put(self, key, value):
+        """ Adds an entry, dropping the least recently used entry if the cache is full
+
+        Args:
+            key (tuple): the key of the entry
+            value: the value of the entry, anything but None
+        """
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+
+    def stats(self):
+        """ Gets the statistics of the cache
+
+        Returns:
+            dict: the hits, misses, hit rate, dropped entries and current number of entries
+        """
+        lookups = self.hits + self.misses
+        return {"hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "size": len(self.entries)}
+
+
+class Bot:
+    def __init__(self, weights=None, use_hold=True, lookahead=True, cache_size=CACHE_SIZE):
+        """ Initializes the Bot Object
+        Plays the game by trying every final position of the current block (and of the block it could hold),
+        scoring the resulting boards and playing the best one.
+
+        Bot Object will have:
+        - the weights of the board features it scores boards with
+        - whether it considers holding the current block
+        - whether it also places the next block on every resulting board before scoring it
+        - a TranspositionCache of the best placement of a block on every searched board (if applicable)
+        - the number of placements it has evaluated
+
+        Args:
+            weights (dict, optional): the weight of every feature in WEIGHTS. Defaults to WEIGHTS.
+            use_hold (bool, optional): whether to consider holding. Defaults to True.
+            lookahead (bool, optional): whether to look ahead at the next block. Defaults to True.
+            cache_size (int, optional): the size of the cache, 0 for no cache. Defaults to CACHE_SIZE.
+        """
+        self.weights = WEIGHTS if weights is None else weights
+        self.use_hold = use_hold
+        self.lookahead = lookahead
+        self.cache = TranspositionCache(cache_size) if cache_size else None
+        self.evaluated = 0
+
+
+    def placements(self, rows, surface, block_type, rotation=0):
+        """ Finds every reachable final position of a block brought in at the top of the board.
+        The block is rotated at the top, moved sideways and hard dropped, so every rotation and
+        every column it passes through must have space for it.
+
+        Args:
+            rows (tuple of ints): the row bitmasks of the board
+            surface (Surface): the heights and holes of the board
+            block_type (int): the type of the block
+            rotation (int, optional): the rotation the block starts in. Defaults to 0.
+
+        Yields:
+            tuple: (rotation, x, y) of every final position
+        """
+        orientations = ROTATIONS[block_type]
+        # the top of the board is empty most of the time, and then every path is clear
+        clear = not any(rows[START_Y:START_Y + 4])
+        for target in UNIQUE_ROTATIONS[block_type]:
+            orientation = orientations[target]
+            if not clear and not self.can_rotate(rows, block_type, rotation, target):
+                continue
+            for x in range(GAME_WIDTH - orientation.width + 1):
+                y = surface.landing_row(orientation, x)
+                if y < START_Y:
+                    continue
+                if not clear and not all(fits(rows, orientation, column, START_Y) for column in range(min(x, START_X), max(x, START_X) + 1)):
+                    continue
+                yield target, x, y
+
+
+    def can_rotate(self, rows, block_type, rotation, target):
+        """ Checks if a block at the top of the board can be turned from one rotation to another
+
+        Args:
+            rows (tuple of ints): the row bitmasks of the board
+            block_type (int): the type of the block
+            rotation (int): the rotation the block starts in
+            target (int): the rotation to reach
+
+        Returns:
+            bool: True if every rotation on the way has space at the top of the board
+        """
+        for turns in rotation_actions(rotation, target):
+            rotation = (rotation + (1 if turns == ROTATE_CCW else -1)) % 4
+            if not fits(rows, ROTATIONS[block_type][rotation], START_X, START_Y):
+                return False
+        return True
+
+
+    def best_score(self, rows, surface, block_type, lines=0):
+        """ Scores the best placement of a block on a board
+
+        Args:
+            rows (tuple of ints): the row bitmasks of the board
+            surface (Surface): the heights and holes of the board
+            block_type (int): the type of the block
+            lines (int, optional): the lines already cleared to reach the board. Defaults to 0.
+
+        Returns:
+            float: the score of the best resulting board, or None if the block cannot be placed
+        """
+        score, _ = self.search(rows, surface, block_type)
+        if score is None:
+            return None
+        # the lines only add a constant to the score of every placement, so they are left out of the cache
+        return score + self.weights["lines"] * lines
+
+
+    def search(self, rows, surface, block_type):
+        """ Finds the best placement of a block on a board, looking it up in the cache first.
+        Every resulting board is scored from a copy of the Surface updated by the placement, without scanning the board.
+
+        Args:
+            rows (tuple of ints): the row bitmasks of the board
+            surface (Surface): the heights and holes of the board
+            block_type (int): the type of the block
+
+        Returns:
+            tuple: the score of the best resulting board and its (rotation, x, y), both None if the block cannot be placed
+        """
+        if self.cache is not None:
+            key = (rows, block_type)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        best = best_position = None
+        for rotation, x, y in self.placements(rows, surface, block_type):
+            _, new_surface, new_lines = place(rows, surface, block_type, rotation, x, y)
+            score = evaluate(new_surface, new_lines, self.weights)
+            self.evaluated += 1
+            if best is None or score > best:
+                best, best_position = score, (rotation, x, y)
+        if self.cache is not None:
+            self.cache.put(key, (best, best_position))
+        return best, best_position
+
+
+    def best_placement(self, engine):
+        """ Finds the best placement for the current block of a game
+
+        Args:
+            engine (Engine): the game
+
+        Returns:
+            Placement: the best placement, or None if no placement is reachable
+        """
+        rows, surface = engine.blocks, engine.surface
+        block = engine.current_block
+        next_type = engine.next_block.block_type
+        # (hold, block type, starting rotation, block placed afterwards)
+        options = [(False, block.block_type, block.rotation, next_type)]
+        if self.use_hold and engine.can_hold:
+            if engine.block_held is None:
+                options.append((True, next_type, 0, block.block_type))
+            else:
+                options.append((True, engine.block_held.block_type, engine.block_held.rotation, next_type))
+
+        best = None
+        for hold, block_type, start_rotation, follow in options:
+            for rotation, x, y in self.placements(rows, surface, block_type, start_rotation):
+                new_rows, new_surface, lines = place(rows, surface, block_type, rotation, x, y)
+                if self.lookahead:
+                    score = self.best_score(new_rows, new_surface, follow, lines)
+                    if score is None:
+                        continue
+                else:
+                    score = evaluate(new_surface, lines, self.weights)
+                    self.evaluated += 1
+                if best is None or score > best.score:
+                    best = Placement(hold, block_type, rotation, x, y, lines, score)
+        return best
+
+
+    def plan(self, engine):
+        """ Finds the best placement for the current block and the actions that play it
+
+        Args:
+            engine (Engine): the game
+
+        Returns:
+            list of ints: the actions to apply, ending with a hard drop
+        """
+        placement = self.best_placement(engine)
+        if placement is None:
+            return [HARD_DROP]
+        actions = []
+        rotation = engine.current_block.rotation
+        if placement.hold:
+            actions.append(HOLD)
+            rotation = 0 if engine.block_held is None else engine.block_held.rotation
+        actions.extend(rotation_actions(rotation, placement.rotation))
+        moves = placement.x - START_X
+        actions.extend([RIGHT] * moves if moves > 0 else [LEFT] * -moves)
+        actions.append(HARD_DROP)
+        return actions
+
+
+    def play(self, engine, action_time=None):
+        """ Plays the current block of a game.
+        With an action_time, gravity moves the block down once every engine.timing seconds while the actions are played,
+        so the game gets harder as it speeds up. The rest of the plan is dropped if gravity locks the block first.
+
+        Args:
+            engine (Engine): the game
+            action_time (float, optional): the seconds every action takes, None for no gravity. Defaults to None.
+        """
+        block = engine.current_block
+        elapsed = 0.0
+        for action in self.plan(engine):
+            engine.step(action)
+            if action == HOLD:
+                block = engine.current_block
+            if action_time is None or engine.current_block is not block:
+                continue
+            elapsed += action_time
+            while elapsed >= engine.timing:
+                elapsed -= engine.timing
+                engine.step(GRAVITY)
+                if engine.current_block is not block:
+                    return
+
+
+def rotation_actions(rotation, target):
+    """Gets the shortest list of rotations that turns a block from one rotation to another
+
+    Args:
+        rotation (int): the rotation the block is in
+        target (int): the rotation to reach
+
+    Returns:
+        list of ints: ROTATE_CCW or ROTATE_CW actions
+    """
+    turns = (target - rotation) % 4
+    if turns == 3:
+        return [ROTATE_CW]
+    return [ROTATE_CCW] * turns
+
+
+def play_game(bot, seed, mode=UNIFORM, max_pieces=None, action_time=ACTION_TIME):
+    """Lets a bot play a whole game without a display, under gravity
+
+    Args:
+        bot (Bot): the player
+        seed (int): the seed of the blocks
+        mode (str, optional): the mode of the PieceSource. Defaults to UNIFORM.
+        max_pieces (int, optional): the number of blocks after which the game is stopped. Defaults to None.
+        action_time (float, optional): the seconds every action takes, None for no gravity. Defaults to ACTION_TIME.
+
+    Returns:
+        tuple: the engine of the finished game and the number of blocks played
+    """
+    engine = Engine(PieceSource(seed, mode))
+    engine.start()
+    pieces = 0
+    while not engine.over and (max_pieces is None or pieces < max_pieces):
+        bot.play(engine, action_time)
+        pieces += 1
+    return engine, pieces
+
+
+def main():
+    """Plays games with the bot without a display and prints their results
+    """
+    parser = argparse.ArgumentParser(description="Let the bot play Tetris without a display")
+    parser.add_argument("--games", type=int, default=5, help="number of games (default: 5)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game (default: 0)")
+    parser.add_argument("--bag", action="store_true", help="deal the blocks from shuffled bags of all 7 shapes")
+    parser.add_argument("--max-pieces", type=int, default=1000, help="stop every game after this many blocks (default: 1000)")
+    args = parser.parse_args()
+
+    bot = Bot()
+    start = time.perf_counter()
+    for game in range(args.games):
+        engine, pieces = play_game(bot, args.seed + game, BAG if args.bag else UNIFORM, args.max_pieces)
+        print(f"Game {game}: score {engine.score}, lines {engine.lines_cleared}, blocks {pieces}, game over: {engine.over}")
+    elapsed = time.perf_counter() - start
+    print(f"{bot.evaluated / elapsed:,.0f} placements evaluated per second")
+    if bot.cache is not None:
+        stats = bot.cache.stats()
+        print(f"Cache: {stats['hits']:,} hits, {stats['misses']:,} misses ({stats['hit_rate']:.1%}), {stats['evictions']:,} evicted")
+
+
+if __name__=="__main__":
+    main()
@@ -1,41 +1,32 @@
-import time
-import random
-import threading
+import argparse
+import math
 import signal
-import curses
-from copy import deepcopy
+from collections import deque
+
+from scheduler import Scheduler
+from replay import Recorder, Replay
+from bot import Bot
+from profiling import Profiler, PHASES
+from latency import LatencyMeter, load_script
+from screen import create_screen, ScreenError, BACKENDS, KEY_LEFT, KEY_RIGHT, KEY_UP, KEY_DOWN
+from engine import Engine, PieceSource, ROTATIONS, overlay_block, drop_row, EMPTY_ROW, UNIFORM, BAG, GAME_WIDTH, GAME_HEIGHT
+from engine import LEFT, RIGHT, ROTATE_CW, ROTATE_CCW, SOFT_DROP, HARD_DROP, HOLD, GRAVITY
+from engine import BOARD_CHANGED, SCORE_CHANGED, NEXT_CHANGED, HOLD_CHANGED, BLOCK_SPAWNED, GAME_OVER
 
 KEY_MAPPINGS = {"H": "Up",
                 "K": "Left",
                 "P": "Down",
                 "M": "Right"}
 
-BLOCKS = [
-    [[1, 1, 1, 1]],
+KEY_ACTIONS = {KEY_LEFT: LEFT,
+               KEY_RIGHT: RIGHT,
+               KEY_UP: ROTATE_CW,
+               KEY_DOWN: SOFT_DROP,
+               ord(' '): HARD_DROP,
+               ord('z'): ROTATE_CCW,
+               ord('c'): HOLD}
 
-    [[1, 1],
-    [1, 1]],
-
-    [[1, 1, 0],
-    [0, 1, 1]],
-
-    [[0, 1, 1],
-    [1, 1, 0]],
-
-    [[1, 0, 0],
-    [1, 1, 1]],
-
-    [[0, 0, 1],
-    [1, 1, 1]],
-
-    [[0, 1, 0],
-    [1, 1, 1]]
-
-]
-
-NUM_OF_BLOCK_TYPES = len(BLOCKS)
-
-SQUARE, EMPTY_BLOCK = "██", "  "
+SQUARE, EMPTY_BLOCK, GHOST_BLOCK = "██", "  ", "░░"
 RIGHT_WALL, LEFT_WALL = "", ""
 LEFT_MID_WALL, RIGHT_MID_WALL, TOP_MID_WALL, BOTTOM_MID_WALL, MID_WALL = "┣", "┫", "┳", "┻", "╋"
 TOP_LEFT_WALL, TOP_RIGHT_WALL, BOTTOM_LEFT_WALL, BOTTOM_RIGHT_WALL = "┏", "┓", "┗", "┛"
@@ -43,400 +34,485 @@ HORIZONTAL_WALL, VERTICAL_WALL = "━", "┃"
 
 SCOREBOARD_WIDTH, SCOREBOARD_HEIGHT = 18 + 2, 1 + 2
 GAME_BOARD_WIDTH, GAME_BOARD_HEIGHT = 20 + 2, 20 + 2
-GAME_WIDTH, GAME_HEIGHT = 10, 20
 RIGHT_MENU_WIDTH, RIGHT_MENU_HEIGHT = 20 + 2, 8 + 2
 BLOCK_HOLD_WIDTH, BLOCK_HOLD_HEIGHT = SCOREBOARD_WIDTH, 10
 INST_MENU_WIDTH, INST_MENU_HEIGHT = RIGHT_MENU_WIDTH, GAME_BOARD_HEIGHT - RIGHT_MENU_HEIGHT
+PROFILE_MENU_WIDTH, PROFILE_MENU_HEIGHT = SCOREBOARD_WIDTH + GAME_BOARD_WIDTH + RIGHT_MENU_WIDTH, len(PHASES) + 1 + 2
 
 BOARD_HEIGHT = 25
 GAME_BOARD_OFFSET = SCOREBOARD_WIDTH
 RIGHT_MENU_OFFSET = GAME_BOARD_OFFSET + GAME_BOARD_WIDTH
 BLOCK_HOLD_OFFSET = SCOREBOARD_HEIGHT
 INST_MENU_OFFSET_X, INST_MENU_OFFSET_Y = RIGHT_MENU_OFFSET, RIGHT_MENU_HEIGHT
+PROFILE_MENU_OFFSET = GAME_BOARD_HEIGHT
+
+# Most frames drawn per second by default
+TARGET_FPS = 60
+
+# Most seconds between two actions of the bot in demo mode, less once the blocks fall faster
+BOT_DELAY = 0.05
+# Seconds between two redraws of the profiling overlay
+PROFILE_INTERVAL = 1.0
+# Seconds the game keeps running after the last key of a key script or the last action of a replay, before it quits
+KEY_SCRIPT_GRACE = 1.0
 
-START_X, START_Y = 5, 0
 GAME_RUNNING = 0
 
 
+def create_row_string(row, ghost_row=EMPTY_ROW):
+    """Builds the characters of a row of the main board
+
+    Args:
+        row (int): the row bitmask of the block units
+        ghost_row (int, optional): the row bitmask of the ghost units, drawn where row is empty. Defaults to EMPTY_ROW.
+
+    Returns:
+        str: SQUARE, GHOST_BLOCK or EMPTY_BLOCK for every column of the row
+    """
+    return ''.join([SQUARE if row >> x & 1 else GHOST_BLOCK if ghost_row >> x & 1 else EMPTY_BLOCK
+                    for x in range(GAME_WIDTH)])
+
+
+def create_preview(block):
+    """Builds the lines drawn for a block in the next block and holding menus
+
+    Args:
+        block (tuple of tuples): the 1s and 0s of the block in one orientation
+
+    Returns:
+        tuple of str: SQUARE or EMPTY_BLOCK for every unit of every row of the block
+    """
+    return tuple(''.join([SQUARE if x else EMPTY_BLOCK for x in row]) for row in block)
+
+
+# The string of every row bitmask without ghost units, indexed by the row, so drawing a row is a lookup.
+# The few rows holding ghost units are built by Board.get_row_string the first time they are drawn.
+ROW_STRINGS = tuple(create_row_string(row) for row in range(1 << GAME_WIDTH))
+# The preview lines of every block type in every orientation, indexed like ROTATIONS
+PREVIEW_STRINGS = tuple(tuple(create_preview(orientation.block) for orientation in rotations) for rotations in ROTATIONS)
+
+
 class Board:
-    def __init__(self):
-        """ Initializes the Board Object 
-        The main logic and display for the Tetris game.
+    def __init__(self, engine=None, scheduler=None, recorder=None, bot=None, profiler=None, fps=TARGET_FPS, ghost=True, screen=None):
+        """ Initializes the Board Object
+        The display and keyboard handling for the Tetris game.
+        The game logic itself lives in the Engine object, which the Board subscribes to.
 
         Board Object will have:
-        - a matrix/list of lists full of zeros as blocks
-        - a GAME score as score
-        - a Block object as current_block
+        - an Engine object as engine
         - a scoreboard menu
         - the main board where the matrix will be displayed
         - the right board where the next piece will be displayed
         - the left board where the block on hold will be displayed
         - an instructions menu
+        - a profiling overlay below the boards (if applicable, and if the terminal is tall enough)
 
-        Using curses:
-        - block the keyboard input and cursor from displaying on the terminal
+        The boards are windows of a screen (see screen.py), drawn with curses or with raw ANSI escape sequences.
 
         Set variables for:
-        - controlling and tracking gravity and events within the game
-        - controlling the speed of the block
-        - counting the number of lines cleared in a single gme
-        - creating the next Block object so it can be displayed before it is inserted in the board
-        - controlling the number of holdable blocks
-        - determining if the user's currently holding a block
-        - checking if the block is immediately on the top.
-        """
-        self.score = 0
-        rows = [0] * GAME_WIDTH
-        self.blocks = [rows.copy() for _ in range(GAME_HEIGHT)]
-        self.blocks_copy = deepcopy(self.blocks)
-        self.current_block = Block(START_X, START_Y)
-        self.stdscr = curses.initscr()
-        self.scoreboard_menu = self.stdscr.subwin(SCOREBOARD_HEIGHT, SCOREBOARD_WIDTH, 0, 0)
-        self.main_board = self.stdscr.subwin(GAME_BOARD_HEIGHT, GAME_BOARD_WIDTH, 0, GAME_BOARD_OFFSET)
-        self.right_menu = self.stdscr.subwin(RIGHT_MENU_HEIGHT, RIGHT_MENU_WIDTH, 0, RIGHT_MENU_OFFSET)
-        self.block_hold_menu = self.stdscr.subwin(BLOCK_HOLD_HEIGHT, BLOCK_HOLD_WIDTH, BLOCK_HOLD_OFFSET, 0)
-        self.instructions_menu = self.stdscr.subwin(INST_MENU_HEIGHT, INST_MENU_WIDTH, INST_MENU_OFFSET_Y, INST_MENU_OFFSET_X)
-
-        curses.noecho()
-        self.stdscr.keypad(True)
-        self.stdscr.nodelay(1)
-        curses.curs_set(0)
-
-        self.gravity_proc = None
-        self.proc_event = None
-        self.timing = 0.5
-        self.lines_cleared = 0
-        self.next_block = Block(START_X, START_Y)
-
-        self.can_hold = 0
-        self.block_held = None
-        self.hard_dropped = 0
+        - scheduling gravity within the single game loop
+        - recording the actions of the game (if applicable)
+        - the recorded game being played back (if applicable)
+        - the bot playing the game in demo mode (if applicable) and its scheduled actions
+        - the keys of a key script that are due, in the order of the script (if applicable)
+        - remembering the rows last drawn on the main board so only the changed rows are redrawn, and the strings of the rows with ghost units
+        - tracking whether anything was drawn since the screen was last flushed
+        - the panels changed since the last frame, the time of the last frame and the scheduled next frame
+        - whether the ghost block, where the current block would land, is drawn
+        - timing the phases of every frame (if applicable)
+
+        Args:
+            engine (Engine, optional): the game to display. Defaults to a new Engine.
+            scheduler (Scheduler, optional): runs the timed events of the game. Defaults to a new Scheduler.
+            recorder (Recorder, optional): records every action applied to the game. Defaults to None.
+            bot (Bot, optional): plays the game instead of the keyboard. Defaults to None.
+            profiler (Profiler, optional): times the phases of every frame. Defaults to None.
+            fps (int, optional): the most frames drawn per second. Defaults to TARGET_FPS.
+            ghost (bool, optional): whether to draw the ghost block. Defaults to True.
+            screen (CursesScreen or AnsiScreen, optional): the terminal to draw on. Defaults to create_screen().
+        """
+        if engine is None:
+            engine = Engine()
+        if scheduler is None:
+            scheduler = Scheduler()
+        self.engine = engine
+        self.scheduler = scheduler
+        if screen is None:
+            screen = create_screen()
+        self.screen = screen
+        self.stdscr = screen.root
+        self.scoreboard_menu = screen.subwin(SCOREBOARD_HEIGHT, SCOREBOARD_WIDTH, 0, 0)
+        self.main_board = screen.subwin(GAME_BOARD_HEIGHT, GAME_BOARD_WIDTH, 0, GAME_BOARD_OFFSET)
+        self.right_menu = screen.subwin(RIGHT_MENU_HEIGHT, RIGHT_MENU_WIDTH, 0, RIGHT_MENU_OFFSET)
+        self.block_hold_menu = screen.subwin(BLOCK_HOLD_HEIGHT, BLOCK_HOLD_WIDTH, BLOCK_HOLD_OFFSET, 0)
+        self.instructions_menu = screen.subwin(INST_MENU_HEIGHT, INST_MENU_WIDTH, INST_MENU_OFFSET_Y, INST_MENU_OFFSET_X)
+        self.profile_menu = None
+        if profiler is not None:
+            try:
+                self.profile_menu = screen.subwin(PROFILE_MENU_HEIGHT, PROFILE_MENU_WIDTH, PROFILE_MENU_OFFSET, 0)
+            except ScreenError: # the terminal is too short, the histograms are still recorded
+                pass
+
+        self.gravity_timer = None
+        self.recorder = recorder
+        self.replay = None
+        self.bot = bot
+        self.bot_timers = []
+        self.script_keys = deque()
+        self.drawn_rows = [None] * GAME_HEIGHT
+        self.ghost_row_strings = {}
+        self.needs_flush = 0
+        self.frame_interval = 1 / fps
+        self.dirty = set()
+        self.last_frame = None
+        self.render_timer = None
+        self.ghost = ghost
+        self.engine.subscribe(self.on_engine_event)
+        self.profiler = profiler
+        if profiler is not None:
+            profiler.instrument(self)
 
 
     def game_over(self):
-        """ Closes the game officially. 
-        Resets the score and sets a conditional Flag to false so the program quits
+        """ Closes the game officially.
+        Sets a conditional Flag to false so the program quits
         """
         global GAME_RUNNING
-        self.score = 0
         GAME_RUNNING = 0
-        self.stdscr.addstr("Game Over! (Ctrl+C)")
+        self.render(self.engine.snapshot())
+        self.stdscr.addstr(0, 0, "Game Over! (Ctrl+C)")
+        self.stdscr.noutrefresh()
+        self.needs_flush = 1
+        self.flush()
         print("Game Over!")
 
 
     def start_game(self):
-        """ Starts the game. 
+        """ Starts the game.
         Main Systematic logic of a generic game.
         Runs the Tetris logic:
         - sets the conditional flag to true and initializes the display boards for the game.
-        - creates the first block object
+        - brings the first block into the board
         - begins the Tetris game loop
         """
         global GAME_RUNNING
         GAME_RUNNING = 1
         self.create_all_boards()
-        self.get_new_block()
+        if self.recorder is not None:
+            self.recorder.start()
+        self.engine.start()
+        if self.profile_menu is not None:
+            self.update_profile_menu()
         self.update_board()
 
 
-    def is_gameover(self):
-        """ Checks if the current block overlaps with any units of the accumulated blocks.
-        Called every time after a block has reached the base to detect if the blocks have reached the top of the board
-        Returns:
-            Boolean: True if any unit of the inserted block shares a space in the matrix with any existing populated unit
-        """
-        block = self.current_block.return_block()
-        block_height = len(block)
+    def play_replay(self, replay):
+        """ Plays back a recorded game in real time, and quits after the last recorded action.
+        The recorded actions, gravity included, are scheduled at the time they were recorded and the keyboard is ignored.
+        The engine of the Board must have been created by replay.create_engine.
 
-        for height in range(block_height):
-            for width in range(len(block[0])):
-                if block[height][width] and self.blocks[START_Y + height][START_X + width]:
-                    return True
-        return False
+        Args:
+            replay (Replay): the recorded game
+        """
+        global GAME_RUNNING
+        GAME_RUNNING = 1
+        self.replay = replay
+        self.create_all_boards()
+        self.engine.start()
+        start = self.scheduler.clock()
+        for time_ms, action in replay.events:
+            self.scheduler.call_at(start + time_ms / 1000, self.engine.submit, action)
+        last = replay.events[-1][0] / 1000 if replay.events else 0
+        self.scheduler.call_at(start + last + KEY_SCRIPT_GRACE, self.quit_game)
+        if self.profile_menu is not None:
+            self.update_profile_menu()
+        self.update_board()
 
 
-    def check_collision(self, new_x, new_y):
-        """ Checks if the block can continue moving in the given direction by the new_x new_y coordinates
+    def play_keys(self, keys):
+        """ Schedules a scripted stream of key presses, handled as if typed, and quits the game after the last one.
+        Called before the game starts, so the same script plays out the same way on every run.
+        The due keys wait in script_keys and are handled first in, first out, one per pass of the game loop,
+        so keys due at the same time keep the order of the script.
 
         Args:
-            new_x (int): the index of the column of the row that the block is moving towards x/9
-            new_y (int): the index of the row of the matrix the block is moving towards y/19
-            **9 and 19 symbolize the index max in the 20*10 matrix that makes up the board. 
-
-        Returns:
-            boolean: True (meaning there is a collision) if the block and the next unit in the direction 
-            it is moving towards are both populated. 
+            keys (list of tuples): (milliseconds since the start of the game, key code) of every key
         """
-        block = self.current_block.return_block()
-        block_height = len(block)
-        blocks_copy = deepcopy(self.blocks)
-
-        for width in range(len(block[0])):
-            for height in range(block_height):
-                if block[height][width] == 1:
-                    blocks_copy[self.current_block.get_y() + height][self.current_block.get_x() + width] = 0
-
-        for width in range(len(block[0])):
-            for height in range(block_height):
-                if blocks_copy[new_y + height][new_x + width] == 1 and block[height][width] == 1:
-                    return True
-        return False
-    
-
-    def block_gravity(self, event):
-        """ Moves block down 1 unit for every interval. 
-        Run by a background Thread througout the entirety of the block's moving lifespan.
-        Called by the get_new_block function.
-        Note that this function calls its parent function. But it checks if the game is over so it breaks the infinite loop. 
+        start = self.scheduler.clock()
+        for time_ms, key in keys:
+            self.scheduler.call_at(start + time_ms / 1000, self.script_keys.append, key)
+        last = keys[-1][0] / 1000 if keys else 0
+        self.scheduler.call_at(start + last + KEY_SCRIPT_GRACE, self.quit_game)
 
-        Args:
-            event (threading.Event()): the running Thread that will be set when the get_new_block function is called again. 
-            
+
+    def quit_game(self):
+        """ Stops the game loop without ending the game
         """
         global GAME_RUNNING
-        time.sleep(self.timing)
-        while GAME_RUNNING and not event.is_set():
-            # loop breaks get_new_block function gets called on a hard drop and the event gets set 
-            # otherwise it breaks when a collision occurs. 
-            try:
-                if self.check_collision(self.current_block.get_x(), self.current_block.get_y() + 1):
-                    if self.is_gameover():
-                        self.game_over()
-                    break
-            except Exception as e:
-                if self.is_gameover():
-                    self.game_over()
-                break
-            self.shift_block(self.current_block.get_x(), self.current_block.get_y() + 1)
-            time.sleep(self.timing)
-        if GAME_RUNNING and not event.is_set():
-            # only runs if loop broke by collision
-            self.get_new_block()
-            self.check_lines()
+        GAME_RUNNING = 0
 
 
-    def get_new_block(self):
-        """ Creates a new block, ends the previous Thread, and starts a new Thread that moves the block down. 
+    def step(self, action):
+        """ Submits an action to the game, recording it if the game is being recorded.
+        The action is applied by the game loop, the only writer of the game state.
 
+        Args:
+            action (int): one of the actions of the engine
         """
-        self.can_hold = 1
-        self.blocks = deepcopy(self.blocks_copy)
-        self.current_block = self.next_block
-        self.next_block = Block(START_X, START_Y)
-        self.update_next_block()
-        self.insert_block_into_board(self.current_block.get_x(), self.current_block.get_y())
-        if self.gravity_proc is not None: # Ensures that only 1 block_gravitythread is running at a time
-            if self.gravity_proc.is_alive(): self.proc_event.set() # sets the previous thread to set so that block_gravity function will exit from the while loop
-        self.proc_event = threading.Event()
-        self.gravity_proc = threading.Thread(target=self.block_gravity, args=(self.proc_event,))
-        self.gravity_proc.start()
+        if self.recorder is not None:
+            self.recorder.record(action)
+        self.engine.submit(action)
 
-    def update_board(self):
-        """Rotates, or moves the block depending on the user's keyboard input. 
-        Also contains the functions for hard dropping, rotating anti-clockwise and holding the block
+
+    def on_engine_event(self, event, engine):
+        """ Marks the part of the display affected by a change in the game to be redrawn in the next frame
+
+        Args:
+            event (str): the kind of change published by the engine
+            engine (Engine): the engine that changed
         """
-        global GAME_RUNNING
-        while GAME_RUNNING:
-            self.update_main_board(self.blocks_copy)
-            key = self.stdscr.getch()
-            if key == curses.KEY_LEFT:
-                self.change_position(is_right=0)
-            elif key == curses.KEY_RIGHT:
-                self.change_position(is_right=1)
-            elif key == curses.KEY_UP:
-                self.rotate_block(clockwise=1)
-            elif key == curses.KEY_DOWN:
-                try:
-                    if not self.check_collision(self.current_block.get_x(), self.current_block.get_y() + 1):
-                        self.shift_block(self.current_block.get_x(), self.current_block.get_y() + 1)
-                except:
-                    pass
-            elif key == ord(' '):
-                self.hard_drop()
-            elif key == ord('z'):
-                self.rotate_block(clockwise=0)
-            elif key == ord('c'):
-                self.hold_block()
-            self.stdscr.refresh()
-            
-
-    def insert_block_into_board(self, x, y):
-        """Inserts the blocks into the board starting at x,y position. 
-        converts the respective units to 1s and 0s to display the correct block shape       
+        if event in (BOARD_CHANGED, SCORE_CHANGED, NEXT_CHANGED, HOLD_CHANGED):
+            self.mark_dirty(event)
+        elif event == BLOCK_SPAWNED:
+            self.schedule_gravity()
+            if self.bot is not None:
+                self.schedule_bot_moves()
+        elif event == GAME_OVER:
+            self.game_over()
+
+
+    def mark_dirty(self, panel):
+        """ Marks a panel to be redrawn and schedules the next frame, if it is not scheduled yet.
+        A frame is drawn at most once every frame_interval seconds, so any number of changes in between cost one frame.
 
         Args:
-            x (int): the index of the column at which the block is to be inserted
-            y (_type_): the index of the row in the matrix at which the block is to be inserted
+            panel (str): the event of the engine the panel shows
         """
-        block = self.current_block.return_block()
-        block_height = len(block)
-        self.blocks_copy = deepcopy(self.blocks)
+        self.dirty.add(panel)
+        if self.render_timer is None:
+            now = self.scheduler.clock()
+            due = now if self.last_frame is None else max(now, self.last_frame + self.frame_interval)
+            self.render_timer = self.scheduler.call_at(due, self.render)
 
-        for height in range(block_height):
-            for width in range(len(block[0])):
-                if block[height][width]:
-                    self.blocks_copy[y + height][x + width] = 1
 
+    def render(self, state=None):
+        """ Draws the panels changed since the last frame from a snapshot of the game, and flushes them
+        to the terminal in a single update
 
-    def shift_block(self, new_x, new_y):
-        """Shifts the block to start from the new_x,new_y coordinates
-        Inserts the block into the updated position and displays the updated view
+        Args:
+            state (GameState, optional): the snapshot to draw. Defaults to the snapshot last published by the engine.
+        """
+        if state is None:
+            state = self.engine.published
+        if self.render_timer is not None:
+            self.scheduler.cancel(self.render_timer)
+            self.render_timer = None
+        self.last_frame = self.scheduler.clock()
+        dirty, self.dirty = self.dirty, set()
+        if BOARD_CHANGED in dirty:
+            self.update_main_board(overlay_block(state.blocks, state.current_block), self.get_ghost(state) if self.ghost else None)
+        if SCORE_CHANGED in dirty:
+            self.update_score(state.score)
+        if NEXT_CHANGED in dirty:
+            self.update_next_block(state.next_block)
+        if HOLD_CHANGED in dirty:
+            self.update_hold_menu(state.block_held)
+        self.flush()
+
+
+    def get_ghost(self, state):
+        """ Gets the units of the ghost block: the current block where a hard drop would lock it
 
         Args:
-            new_x (int): the index of the column at which the block is to be inserted
-            new_y (int): the index of the row in the matrix at which the block is to be inserted
+            state (GameState): the snapshot being drawn
+
+        Returns:
+            tuple of ints: the row bitmasks of the ghost block, without the units covered by the current block
         """
-        self.current_block.update_x(new_x)
-        self.current_block.update_y(new_y)
-        self.insert_block_into_board(self.current_block.get_x(), self.current_block.get_y())
-        self.update_main_board(self.blocks_copy)
+        block = state.current_block
+        ghost_y = drop_row(state.blocks, state.heights, block)
+        rows = [EMPTY_ROW] * GAME_HEIGHT
+        for height, mask in enumerate(block.row_masks()):
+            rows[ghost_y + height] = mask << block.x
+        for height, mask in enumerate(block.row_masks()):
+            rows[block.y + height] &= ~(mask << block.x)
+        return rows
 
 
-    def change_position(self, is_right):
-        """Moves the block right or left
-        Only moves the block if it is within the bounds of the main board
+    def block_gravity(self):
+        """ Moves block down 1 unit and schedules the next move one interval later.
+        Run by the scheduler for the entirety of the block's moving lifespan.
+        If the block locks, the next block has already scheduled its own gravity through schedule_gravity.
+        """
+        self.gravity_timer = None
+        self.step(GRAVITY)
+        if self.gravity_timer is None and not self.engine.over:
+            self.gravity_timer = self.scheduler.call_later(self.engine.timing, self.block_gravity)
 
-        Args:
-            is_right (bool): Indicator of whether the block is moving right or left
+
+    def schedule_gravity(self):
+        """ Cancels the gravity of the previous block and schedules the first move of the new block.
+        Called whenever a new block is brought into the board.
+        Recorded games bring their own gravity moves, so nothing is scheduled while playing one back.
         """
-        if is_right:
-            try:
-                if not self.check_collision(self.current_block.get_x() + 1, self.current_block.get_y()):
-                    self.current_block.update_x(self.current_block.get_x() + 1)
-            except Exception as e:
-                return
-        else:
-            try:
-                if not self.check_collision(self.current_block.get_x() - 1, self.current_block.get_y()) and\
-                not self.current_block.get_x() == 0:
-                    self.current_block.update_x(self.current_block.get_x() - 1)
-            except Exception as e:
-                return
-        self.shift_block(self.current_block.get_x(), self.current_block.get_y())
+        if self.replay is not None:
+            return
+        if self.gravity_timer is not None: # Ensures that only 1 gravity move is scheduled at a time
+            self.scheduler.cancel(self.gravity_timer)
+        self.gravity_timer = self.scheduler.call_later(self.engine.timing, self.block_gravity)
 
 
-    def rotate_block(self, clockwise=0):
-        """Rotates the block clockwise(default)
+    def schedule_bot_moves(self):
+        """ Lets the bot plan the new block and schedules its actions BOT_DELAY seconds apart.
+        Called whenever a new block is brought into the board, dropping what is left of the previous plan.
+        The plan is made for the block at the top of the board, so once the game is too fast for BOT_DELAY
+        the actions are brought closer together to all be played before the first gravity move.
+        """
+        for timer in self.bot_timers:
+            self.scheduler.cancel(timer)
+        actions = self.bot.plan(self.engine)
+        delay = min(BOT_DELAY, self.engine.timing / (len(actions) + 1))
+        self.bot_timers = [self.scheduler.call_later((i + 1) * delay, self.step, action) for i, action in enumerate(actions)]
 
-        Args:
-            clockwise (int, optional): If 0 rotates anti-clockwise, otherwise, rotates clockwise. Defaults to 0.
+
+    def update_board(self):
+        """Rotates, or moves the block depending on the user's keyboard input.
+        Also contains the functions for hard dropping, rotating anti-clockwise and holding the block
+        The single game loop: every pass applies the submitted actions, runs the gravity moves and frames that are due,
+        flushes what was drawn outside of a frame and then sleeps in getch until a key is pressed or the next scheduled event is due.
         """
-        try:
-            if clockwise:
-                self.current_block.rotate_clockwise()
-            else:
-                self.current_block.rotate_anticlockwise()
-            self.shift_block(self.current_block.get_x(), self.current_block.get_y())
-        except:
-            if clockwise:
-                self.current_block.rotate_anticlockwise()
+        global GAME_RUNNING
+        while GAME_RUNNING:
+            if self.engine.has_commands():
+                self.engine.process_commands()
+            self.scheduler.run_due()
+            if not GAME_RUNNING:
+                break
+            self.flush()
+            if self.script_keys:
+                self.handle_key(self.script_keys.popleft())
             else:
-                self.current_block.rotate_clockwise()
-            self.shift_block(self.current_block.get_x(), self.current_block.get_y())
+                self.handle_key(self.screen.getch(0 if self.engine.has_commands() else self.input_timeout()))
+
+
+    def handle_key(self, key):
+        """Applies the action bound to a key pressed by the player
+        Keys are ignored while a recorded game is played back or the bot is playing.
 
-    def check_lines(self):
-        """Checks for full rows, clears them, and adds an empty row to the top of the matrix
-        """
-        lines = []
-        for line_num in range(len(self.blocks)):
-             if len(self.blocks[line_num]) == sum(self.blocks[line_num]):
-                lines.append(line_num)
-        if len(lines) != 0:
-            self.clear_lines(lines)
-
-
-    def clear_lines(self, lines):
-        """Clears all the lines in the main board given by the lines array 
-        Adds the default 0 rows to the top for every cleared line
-        Calculates the points won and increases the score on the board. 
-        
         Args:
-            lines (array): A list containing the indeces of all the full rows
+            key (int): the key returned by getch, -1 if no key was pressed
         """
-        multiplier = len(lines)
-        for line in lines:
-            self.blocks.pop(line)
-            self.blocks.insert(0, [0] * GAME_WIDTH)
-        self.score += 10 * multiplier
-        self.lines_cleared += len(lines)
-        if (self.lines_cleared + 1) % 11 == 0:
-             self.timing /= 1.4
-        self.blocks_copy = deepcopy(self.blocks)
-        self.update_score()
-        self.update_main_board(self.blocks_copy)
-
-
-    # Game features
-    def hard_drop(self):
-        """Drops Block straight down to the top of the accumulated blocks 
+        if key in KEY_ACTIONS and self.replay is None and self.bot is None:
+            self.step(KEY_ACTIONS[key])
+
+
+    def input_timeout(self):
+        """Gets how long getch may wait for a key before the next scheduled event is due
+
+        Returns:
+            int: the timeout in milliseconds, or -1 to wait for a key if nothing is scheduled
         """
-        current_y = self.current_block.get_y()
-        i = 0
-        while i < len(self.blocks):
-            try:
-                if self.check_collision(self.current_block.get_x(), current_y + i):
-                    break
-            except:
-                break
-            i += 1
-        self.shift_block(self.current_block.get_x(), self.current_block.get_y() + i - 1)
-        self.get_new_block()
-        self.check_lines()
-        
-
-    def hold_block(self):
-        """Moves block from main board to holding space 
-        If applicable, swaps block from holding space with block in the main board
-        If there are no blocks in holding space, move current block and insert new block into main board.
+        deadline = self.scheduler.next_deadline()
+        if deadline is None:
+            return -1
+        return max(0, math.ceil((deadline - self.scheduler.clock()) * 1000))
+
+
+    def flush(self):
+        """Sends everything drawn since the last flush to the terminal in a single update
+        The update functions only stage their window with noutrefresh, so a frame costs one doupdate.
         """
-        if self.can_hold:
-            if self.block_held is None:
-                self.blocks_copy = deepcopy(self.blocks)
-                self.update_main_board(self.blocks_copy)
-                self.block_held = self.current_block
-                self.get_new_block()
-            else:
-                self.block_held, self.current_block = self.current_block, self.block_held
-            self.can_hold = 0
-            self.update_hold_menu()
-            self.block_held.update_x(START_X)
-            self.block_held.update_y(START_Y)
-            
+        if self.needs_flush:
+            self.needs_flush = 0
+            self.screen.doupdate()
+
 
     # Board and menu updates/creations
-    def update_hold_menu(self):
+    def update_profile_menu(self):
+        """Displays the timings of every phase in the profiling overlay and schedules the next redraw
+        """
+        self.profile_menu.erase()
+        self.profile_menu.box()
+        for y, line in enumerate(self.profiler.report()):
+            self.profile_menu.addstr(y + 1, 1, line)
+        self.profile_menu.noutrefresh()
+        self.needs_flush = 1
+        self.scheduler.call_later(PROFILE_INTERVAL, self.update_profile_menu)
+
+
+    def update_hold_menu(self, block_held=None):
         """Displays the current block in the holding menu, (if applicable)
+
+        Args:
+            block_held (Block, optional): the block to display. Defaults to the block held in the engine.
         """
-        self.block_hold_menu.clear()
+        if block_held is None:
+            block_held = self.engine.block_held
+        self.block_hold_menu.erase()
         self.block_hold_menu.box()
         self.block_hold_menu.addstr(1, 1, "Holding:")
-        block = self.block_held.return_block()
-        for y in range(len(block)):
-            self.block_hold_menu.addstr(BLOCK_HOLD_HEIGHT//3 + y + 1, BLOCK_HOLD_WIDTH//3 + 2, ''.join([SQUARE if x else EMPTY_BLOCK for x in block[y]]))
+        for y, line in enumerate(PREVIEW_STRINGS[block_held.block_type][block_held.rotation]):
+            self.block_hold_menu.addstr(BLOCK_HOLD_HEIGHT//3 + y + 1, BLOCK_HOLD_WIDTH//3 + 2, line)
 
-        self.block_hold_menu.refresh()
+        self.block_hold_menu.noutrefresh()
+        self.needs_flush = 1
 
 
-    def update_score(self):
+    def update_score(self, score=None):
         """Displays the current score on the scoreboard
+
+        Args:
+            score (int, optional): the score to display. Defaults to the score of the engine.
         """
-        self.scoreboard_menu.addstr(1, 1, f"Score: {self.score}")
-        self.scoreboard_menu.refresh()
+        if score is None:
+            score = self.engine.score
+        self.scoreboard_menu.addstr(1, 1, f"Score: {score}")
+        self.scoreboard_menu.noutrefresh()
+        self.needs_flush = 1
 
-    def update_main_board(self, blocks=None):
-        """Merges the bottom of the board with the accumulated blocks to form a new bottom to allow for checking collisions
+    def update_main_board(self, blocks=None, ghost=None):
+        """Draws the rows of the game onto the main board
+        Only the rows that differ from the last drawn frame are redrawn, with their strings looked up by get_row_string.
 
         Args:
-            blocks (array, optional): _description_. Defaults to None.
+            blocks (tuple, optional): the row bitmasks to draw. Defaults to the board of the engine with its moving block.
+            ghost (list, optional): the row bitmasks of the ghost block, drawn where blocks is empty. Defaults to None.
         """
         if blocks is None:
-            blocks = self.blocks
+            blocks = self.engine.get_board()
+        changed = 0
         for y in range(len(blocks)):
-            self.main_board.addstr(y + 1, 1, ''.join([SQUARE if x else EMPTY_BLOCK for x in blocks[y]]))
-        # for y in range(len(self.blocks)):
-        #     for x in range(len(self.blocks[0])):
-        #         if self.blocks[y][x]: self.main_board.addstr(y + 1, x*2 + 1, SQUARE)
-        self.main_board.refresh()
+            ghost_row = EMPTY_ROW if ghost is None else ghost[y]
+            # the ghost units are kept above the block units so a row is compared and remembered as one int
+            row = blocks[y] | ghost_row << GAME_WIDTH
+            if row != self.drawn_rows[y]:
+                self.main_board.addstr(y + 1, 1, self.get_row_string(blocks[y], ghost_row))
+                self.drawn_rows[y] = row
+                changed = 1
+        if changed:
+            self.main_board.noutrefresh()
+            self.needs_flush = 1
+
+
+    def get_row_string(self, row, ghost_row):
+        """Gets the characters of a row of the main board
+        Rows without ghost units come from ROW_STRINGS. At most a few rows of a frame hold ghost units, so their
+        strings are built the first time they are drawn and kept in ghost_row_strings.
+
+        Args:
+            row (int): the row bitmask of the block units
+            ghost_row (int): the row bitmask of the ghost units
+
+        Returns:
+            str: SQUARE, GHOST_BLOCK or EMPTY_BLOCK for every column of the row
+        """
+        if ghost_row == EMPTY_ROW:
+            return ROW_STRINGS[row]
+        key = (row, ghost_row)
+        string = self.ghost_row_strings.get(key)
+        if string is None:
+            string = self.ghost_row_strings[key] = create_row_string(row, ghost_row)
+        return string
 
 
     def create_all_boards(self):
@@ -447,21 +523,28 @@ class Board:
         self.create_right_menu()
         self.create_block_hold_menu()
         self.create_instructions_menu()
-        self.scoreboard_menu.addstr(1, 1, f"Score: {self.score}")
+        self.scoreboard_menu.addstr(1, 1, f"Score: {self.engine.score}")
+        self.stdscr.noutrefresh()
+        self.needs_flush = 1
 
 
-    def update_next_block(self):
+    def update_next_block(self, block=None):
         """Updates the block displayed in the next block menu
-        When a new block is created, the next block becomes the current block and a new next_block is generated. 
+        When a new block is created, the next block becomes the current block and a new next_block is generated.
         The function updates the displayed block in the top right menu
+
+        Args:
+            block (Block, optional): the block to display. Defaults to the next block of the engine.
         """
-        self.right_menu.clear()
+        if block is None:
+            block = self.engine.next_block
+        self.right_menu.erase()
         self.right_menu.box()
-        next_block = self.next_block.return_block()
         self.right_menu.addstr(1, 1, "Next Block:")
-        for y in range(len(next_block)):
-            self.right_menu.addstr(RIGHT_MENU_HEIGHT//3 + y + 1, RIGHT_MENU_WIDTH//3 + 2, ''.join([SQUARE if x else EMPTY_BLOCK for x in next_block[y]]))
-        self.right_menu.refresh()
+        for y, line in enumerate(PREVIEW_STRINGS[block.block_type][block.rotation]):
+            self.right_menu.addstr(RIGHT_MENU_HEIGHT//3 + y + 1, RIGHT_MENU_WIDTH//3 + 2, line)
+        self.right_menu.noutrefresh()
+        self.needs_flush = 1
 
 
     def create_right_menu(self):
@@ -501,145 +584,8 @@ class Board:
         self.instructions_menu.addstr(8,1, "<space>: Hard drop")
 
 
-    def get_self_blocks(self):
-        """Returns the list of lists of the saved main board before the last inserted block
-
-        Returns:
-            list of lists: Contains the matrix of the last saved main board.
-        """
-        return self.blocks
-    
-
-    def get_current_blocks(self):
-        """Returns the current moving block or the last inserted block
-
-        Returns:
-            list of lists: contains the matrix of the current block 
-        """
-        return self.current_block
-
-
-class Block:
-    def __init__(self, x, y):
-        """Initializing the block class
-        Consists of:
-        - a block type (of the 7 tetris block shapes)
-        - an array of 1s and 0s in the shape of the given block (from the BLOCKS array)
-        - height of the block
-        - width of the block
-        - horizontal coordinates of the block in the matrix as X
-        - vertical coordinates of the block in the matrix as y
-        
-        Args:
-            x (int): the index of the column at which the block is to be inserted
-            y (int): the index of the row in the matrix at which the block is to be inserted
-        """
-        self.block_type = random.randint(0, NUM_OF_BLOCK_TYPES - 1)
-        self.block = BLOCKS[self.block_type]
-        self.height = len(self.block)
-        self.width = len(self.block[0])
-        self.x = x
-        self.y = y
-
-
-    def create_nblock(self, given_block):
-        """Displays the block from the block array
-
-        Args:
-            given_block (list of lists): Selected permutation from BLOCKS array
-
-        Returns:
-            string: Display characters for given block permutation
-        """
-        new_block = []
-        for block in given_block:
-            b = []
-            for is_block in block:
-                if is_block:
-                    b.append(SQUARE)
-                else:
-                    b.append(EMPTY_BLOCK)
-            new_block.append(b)
-        return '\n'.join([''.join(block) for block in new_block])
-
-
-    def rotate_anticlockwise(self):
-        """Rotates the block anticlockwise preserving its shape"""
-        self.block = [[self.block[j][i] for j in range(len(self.block))] for i in range(len(self.block[0]) - 1, -1, -1)]
-
-
-    def rotate_clockwise(self):
-        """Rotates the block clockwise preserving its shape"""
-        for _ in range(3):
-            self.rotate_anticlockwise()
-
-
-    def return_block(self):
-        """Returns the block permutation (can be either one of those from the BLOCKS array in any one of its rotated orientations)
-
-        Returns:
-            list of lists: current block with its preserved rotation state
-        """
-        return self.block
-    
-    
-    def get_x(self):
-        """Gets the index of the column at which the block is 
-
-        Returns:
-            int: the index of the column at which the block is 
-        """
-        return self.x
-
-
-    def get_y(self):
-        """Gets the index of the row at which the block is
-
-        Returns:
-            int: the index of the column at which the block is 
-        """
-        return self.y
-
-
-    def get_height(self):
-        """Gets the height of the block
-
-        Returns:
-            int: number of rows in the block permutation
-        """
-        return self.height
-
-
-    def get_width(self):
-        """Gets the width of the block
-
-        Returns:
-            int: number of columns in the block permutation
-        """
-        return self.width
-    
-
-    def update_x(self,x):
-        """updates the index of the column at which the block is 
-
-        Args:
-            x (int): the index of the column in the matrix that the block is
-        """
-        self.x = x
-        
-
-    def update_y(self, y):
-        """updates the index of the row at which the block is 
-
-        Args:
-            x (int): the index of the row in the matrix that the block is
-        """
-
-        self.y = y
-
-
 def signal_handler(sig, frame):
-    """Resets the conditional flag and ends the program 
+    """Resets the conditional flag and ends the program
 
     Args:
         sig (int): A signal int code that would trigger this function
@@ -650,13 +596,73 @@ def signal_handler(sig, frame):
     GAME_RUNNING = 0
 
 
+def positive_int(value):
+    """Parses a command line value that must be a whole number of at least 1
+
+    Args:
+        value (str): the value given on the command line
+
+    Returns:
+        int: the number
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: {value!r}")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1: {number}")
+    return number
+
+
 def main():
     """main function of this python program that creates the board class and starts the game.
     """
-    BOARD = Board()
+    parser = argparse.ArgumentParser(description="Tetris in the terminal")
+    parser.add_argument("--seed", type=int, help="seed of the block sequence, to replay the same blocks")
+    parser.add_argument("--bag", action="store_true", help="deal the blocks from shuffled bags of all 7 shapes")
+    parser.add_argument("--record", metavar="FILE", help="save a replay of the game to FILE")
+    parser.add_argument("--replay", metavar="FILE", help="play back a replay saved with --record")
+    parser.add_argument("--bot", action="store_true", help="demo mode: let the bot play")
+    parser.add_argument("--no-ghost", action="store_true", help="do not draw where the block would land")
+    parser.add_argument("--fps", type=positive_int, default=TARGET_FPS, help=f"most frames drawn per second (default: {TARGET_FPS})")
+    parser.add_argument("--profile", metavar="FILE", help="time every phase of the frames, show them below the game and save them as JSON to FILE")
+    parser.add_argument("--latency", metavar="FILE", help="measure the input to display latency, print it on exit and save it as JSON to FILE")
+    parser.add_argument("--backend", choices=BACKENDS, help="draw with curses or with raw ANSI escape sequences (default: curses if it is installed)")
+    parser.add_argument("--keys", metavar="SCRIPT", help="play the keys of SCRIPT (\"<ms> <key>\" per line) instead of the keyboard, then quit")
+    args = parser.parse_args()
+    if args.record and args.seed is not None and args.seed < 0:
+        parser.error("--record needs a --seed of 0 or more")
+
     signal.signal(signal.SIGINT, signal_handler)
-    BOARD.start_game()
-    
+    profiler = Profiler() if args.profile else None
+    latency_meter = LatencyMeter() if args.latency else None
+    screen = create_screen(args.backend)
+    try:
+        if args.replay:
+            replay = Replay.load(args.replay)
+            BOARD = Board(replay.create_engine(), profiler=profiler, fps=args.fps, ghost=not args.no_ghost, screen=screen)
+            if latency_meter is not None:
+                latency_meter.instrument(BOARD)
+            BOARD.play_replay(replay)
+        else:
+            scheduler = Scheduler()
+            piece_source = PieceSource(args.seed, BAG if args.bag else UNIFORM)
+            recorder = Recorder(piece_source, scheduler.clock) if args.record else None
+            BOARD = Board(Engine(piece_source), scheduler, recorder, Bot() if args.bot else None, profiler, args.fps, not args.no_ghost, screen)
+            if latency_meter is not None:
+                latency_meter.instrument(BOARD)
+            if args.keys:
+                BOARD.play_keys(load_script(args.keys))
+            BOARD.start_game()
+            if recorder is not None:
+                recorder.save(args.record)
+    finally:
+        screen.close()
+    if profiler is not None:
+        profiler.dump(args.profile)
+    if latency_meter is not None:
+        latency_meter.print_report()
+        latency_meter.dump(args.latency)
 
 if __name__=="__main__":
     main()
@@ -0,0 +1,966 @@
+import queue
+import random
+from collections import deque, namedtuple
+
+BLOCKS = [
+    [[1, 1, 1, 1]],
+
+    [[1, 1],
+    [1, 1]],
+
+    [[1, 1, 0],
+    [0, 1, 1]],
+
+    [[0, 1, 1],
+    [1, 1, 0]],
+
+    [[1, 0, 0],
+    [1, 1, 1]],
+
+    [[0, 0, 1],
+    [1, 1, 1]],
+
+    [[0, 1, 0],
+    [1, 1, 1]]
+
+]
+
+NUM_OF_BLOCK_TYPES = len(BLOCKS)
+
+GAME_WIDTH, GAME_HEIGHT = 10, 20
+START_X, START_Y = 5, 0
+
+# Each row of the board is an int where bit x is set if column x is populated
+EMPTY_ROW, FULL_ROW = 0, (1 << GAME_WIDTH) - 1
+
+# Ways a PieceSource picks the next block type
+UNIFORM, BAG = "uniform", "bag"
+PIECE_MODES = (UNIFORM, BAG)
+
+# Actions accepted by Engine.step
+NOOP, LEFT, RIGHT, ROTATE_CW, ROTATE_CCW, SOFT_DROP, HARD_DROP, HOLD, GRAVITY = range(9)
+ACTIONS = (NOOP, LEFT, RIGHT, ROTATE_CW, ROTATE_CCW, SOFT_DROP, HARD_DROP, HOLD, GRAVITY)
+
+# Events published to the subscribers of an Engine
+BOARD_CHANGED = "board"
+SCORE_CHANGED = "score"
+NEXT_CHANGED = "next"
+HOLD_CHANGED = "hold"
+BLOCK_SPAWNED = "spawn"
+GAME_OVER = "game_over"
+
+# The shape of a block in one orientation: its 1s and 0s, one bitmask per row,
+# the (x, y) offsets of its populated units, its size and the row offsets of its highest and lowest unit in every column
+Orientation = namedtuple("Orientation", ["block", "masks", "cells", "width", "height", "bottoms", "tops"])
+
+# The state of a game. blocks is the tuple of row bitmasks of the locked blocks only:
+# the moving current_block is drawn over them with overlay_block when needed. heights is the height of every column.
+GameState = namedtuple("GameState", ["blocks", "current_block", "next_block", "block_held",
+                                     "score", "lines_cleared", "timing", "over", "heights"])
+
+
+class Engine:
+    def __init__(self, piece_source=None):
+        """ Initializes the Engine Object
+        The rules of the Tetris game, without any display or keyboard handling.
+
+        Engine Object will have:
+        - a tuple of row bitmasks of the locked blocks as blocks, replaced (never changed) whenever blocks lock or rows clear,
+          so every version of the board shares its unchanged rows and can be kept for free
+        - a GAME score as score
+        - a Block object as current_block and another one as next_block
+        - the Block object on hold (if any) as block_held
+        - the PieceSource object the blocks are drawn from
+
+        Set variables for:
+        - controlling the speed of the block (the gravity interval in seconds)
+        - counting the number of lines cleared in a single game
+        - controlling the number of holdable blocks
+        - tracking whether the game has ended
+        - the listeners that are notified whenever the state changes
+        - the queue of actions submitted to the game and the last published snapshot of its state
+        - the Surface object of the locked blocks, read only for everything but the engine
+
+        Args:
+            piece_source (PieceSource, optional): the sequence of blocks of the game. Defaults to a randomly seeded PieceSource.
+        """
+        if piece_source is None:
+            piece_source = PieceSource()
+        self.piece_source = piece_source
+        self.score = 0
+        self.blocks = (EMPTY_ROW,) * GAME_HEIGHT
+        self.surface = Surface()
+        self.current_block = None
+        self.next_block = self.piece_source.next_block()
+        self.block_held = None
+        self.can_hold = 0
+
+        self.timing = 0.5
+        self.lines_cleared = 0
+        self.over = False
+        self.listeners = []
+        self.commands = queue.SimpleQueue()
+        self.published = None
+
+
+    def subscribe(self, listener):
+        """ Registers a listener that is called for every change of the game state
+
+        Args:
+            listener (callable): called as listener(event, engine), event being one of
+            BOARD_CHANGED, SCORE_CHANGED, NEXT_CHANGED, HOLD_CHANGED, BLOCK_SPAWNED or GAME_OVER
+        """
+        self.listeners.append(listener)
+
+
+    def unsubscribe(self, listener):
+        """ Removes a listener previously registered with subscribe
+
+        Args:
+            listener (callable): the listener to remove
+        """
+        self.listeners.remove(listener)
+
+
+    def emit(self, event):
+        """ Notifies every listener of the given event
+
+        Args:
+            event (str): the kind of change that happened
+        """
+        for listener in self.listeners:
+            listener(event, self)
+
+
+    def start(self):
+        """ Starts the game by bringing the first block into the board
+        """
+        self.get_new_block()
+        self.publish()
+        return self.state()
+
+
+    def submit(self, action):
+        """ Queues an action to be applied by process_commands. Safe to call from any thread.
+
+        Args:
+            action (int): one of the actions in ACTIONS
+        """
+        self.commands.put(action)
+
+
+    def has_commands(self):
+        """ Checks if submitted actions are waiting to be applied
+
+        Returns:
+            bool: True if process_commands has actions to apply
+        """
+        return not self.commands.empty()
+
+
+    def process_commands(self):
+        """ Applies the submitted actions in the order they were submitted, then publishes a snapshot of the state.
+        The single writer of the game: only one thread (the game loop) may call it, or step,
+        so the state is never changed by two threads at once.
+
+        Returns:
+            int: the number of actions applied
+        """
+        processed = 0
+        while True:
+            try:
+                action = self.commands.get_nowait()
+            except queue.Empty:
+                break
+            self.step(action)
+            processed += 1
+        if processed:
+            self.publish()
+        return processed
+
+
+    def publish(self):
+        """ Replaces the published snapshot with one of the current state.
+        Readers on other threads (such as a renderer) only ever read published, whose objects never change.
+        """
+        self.published = self.snapshot()
+
+
+    def snapshot(self):
+        """ Returns a copy of the current state of the game that later steps do not change.
+        The board is immutable and shared as is, so only the blocks are copied.
+
+        Returns:
+            GameState: the row bitmasks of the locked blocks, copies of the blocks, the score and the speed
+        """
+        return GameState(self.blocks, self.current_block.copy(), self.next_block.copy(),
+                         self.block_held and self.block_held.copy(), self.score, self.lines_cleared, self.timing, self.over,
+                         self.surface.heights)
+
+
+    def state(self):
+        """ Returns the current state of the game.
+        The blocks are not copied, so the state is only valid until the next step.
+
+        Returns:
+            GameState: the row bitmasks of the locked blocks, the blocks, the score and the speed
+        """
+        return GameState(self.blocks, self.current_block, self.next_block, self.block_held,
+                         self.score, self.lines_cleared, self.timing, self.over, self.surface.heights)
+
+
+    def step(self, action):
+        """ Applies a single action to the game
+
+        Args:
+            action (int): one of the actions in ACTIONS
+
+        Returns:
+            GameState: the state of the game after the action was applied
+        """
+        if self.over:
+            return self.state()
+        if action == LEFT:
+            self.change_position(is_right=0)
+        elif action == RIGHT:
+            self.change_position(is_right=1)
+        elif action == ROTATE_CW:
+            self.rotate_block(clockwise=1)
+        elif action == ROTATE_CCW:
+            self.rotate_block(clockwise=0)
+        elif action == SOFT_DROP:
+            self.soft_drop()
+        elif action == HARD_DROP:
+            self.hard_drop()
+        elif action == HOLD:
+            self.hold_block()
+        elif action == GRAVITY:
+            self.gravity()
+        return self.state()
+
+
+    def end_game(self):
+        """ Marks the game as over and notifies the listeners
+        """
+        self.over = True
+        self.emit(GAME_OVER)
+
+
+    def is_gameover(self):
+        """ Checks if the current block overlaps with any units of the accumulated blocks.
+        Called every time a block is brought into the board to detect if the blocks have reached the top of the board
+        Returns:
+            Boolean: True if any unit of the inserted block shares a space in the matrix with any existing populated unit
+        """
+        for height, mask in enumerate(self.current_block.row_masks()):
+            if self.blocks[START_Y + height] & (mask << START_X):
+                return True
+        return False
+
+
+    def check_collision(self, new_x, new_y):
+        """ Checks if the block can continue moving in the given direction by the new_x new_y coordinates
+
+        Args:
+            new_x (int): the index of the column of the row that the block is moving towards x/9
+            new_y (int): the index of the row of the matrix the block is moving towards y/19
+            **9 and 19 symbolize the index max in the 20*10 matrix that makes up the board.
+
+        Returns:
+            boolean: True (meaning there is a collision) if the block and the next unit in the direction
+            it is moving towards are both populated, or if the block would leave the board.
+        """
+        # self.blocks only holds the locked blocks (the moving block is only drawn over them for display),
+        # so the new position can be tested against it directly without removing the block first
+        masks = self.current_block.row_masks()
+        if new_x < 0 or new_y < 0 or new_x + self.current_block.get_width() > GAME_WIDTH or new_y + len(masks) > GAME_HEIGHT:
+            return True
+        blocks = self.blocks
+        for height, mask in enumerate(masks):
+            if blocks[new_y + height] & (mask << new_x):
+                return True
+        return False
+
+
+    def gravity(self):
+        """ Moves the block down 1 unit.
+        Locks the block into the board if it cannot move any further down.
+        """
+        if self.check_collision(self.current_block.get_x(), self.current_block.get_y() + 1):
+            self.lock_block()
+        else:
+            self.shift_block(self.current_block.get_x(), self.current_block.get_y() + 1)
+
+
+    def lock_block(self):
+        """ Saves the current block into the accumulated blocks, clears any full rows and brings in the next block
+        """
+        block = self.current_block
+        self.blocks = overlay_block(self.blocks, block)
+        self.surface.lock(block)
+        # only the rows the block covers can have become full
+        self.check_lines(block.y, block.y + block.get_height())
+        self.get_new_block()
+
+
+    def get_new_block(self, can_hold=1):
+        """ Makes the next block the current block and creates a new next block.
+        Ends the game if the new block has no space at the top of the board.
+
+        Args:
+            can_hold (int, optional): whether the new block may be held, 0 when it is brought in by holding. Defaults to 1.
+        """
+        self.can_hold = can_hold
+        self.current_block = self.next_block
+        self.next_block = self.piece_source.next_block()
+        self.emit(NEXT_CHANGED)
+        self.insert_block_into_board(self.current_block.get_x(), self.current_block.get_y())
+        self.emit(BOARD_CHANGED)
+        if self.is_gameover():
+            self.end_game()
+        else:
+            self.emit(BLOCK_SPAWNED)
+
+
+    def insert_block_into_board(self, x, y):
+        """Inserts the block into the board starting at x,y position.
+        The locked blocks are left untouched: the moving block is only drawn over them by get_board.
+
+        Args:
+            x (int): the index of the column at which the block is to be inserted
+            y (int): the index of the row in the matrix at which the block is to be inserted
+        """
+        self.current_block.update_x(x)
+        self.current_block.update_y(y)
+
+
+    def shift_block(self, new_x, new_y):
+        """Shifts the block to start from the new_x,new_y coordinates
+        Inserts the block into the updated position
+
+        Args:
+            new_x (int): the index of the column at which the block is to be inserted
+            new_y (int): the index of the row in the matrix at which the block is to be inserted
+        """
+        self.insert_block_into_board(new_x, new_y)
+        self.emit(BOARD_CHANGED)
+
+
+    def change_position(self, is_right):
+        """Moves the block right or left
+        Only moves the block if it is within the bounds of the main board
+
+        Args:
+            is_right (bool): Indicator of whether the block is moving right or left
+        """
+        new_x = self.current_block.get_x() + 1 if is_right else self.current_block.get_x() - 1
+        if not self.check_collision(new_x, self.current_block.get_y()):
+            self.shift_block(new_x, self.current_block.get_y())
+
+
+    def rotate_block(self, clockwise=0):
+        """Rotates the block, undoing the rotation if the rotated block does not fit
+
+        Args:
+            clockwise (int, optional): If 0 rotates anti-clockwise, otherwise, rotates clockwise. Defaults to 0.
+        """
+        if clockwise:
+            self.current_block.rotate_clockwise()
+        else:
+            self.current_block.rotate_anticlockwise()
+        if self.check_collision(self.current_block.get_x(), self.current_block.get_y()):
+            if clockwise:
+                self.current_block.rotate_anticlockwise()
+            else:
+                self.current_block.rotate_clockwise()
+            return
+        self.shift_block(self.current_block.get_x(), self.current_block.get_y())
+
+
+    def soft_drop(self):
+        """Moves the block down 1 unit if there is space below it
+        """
+        if not self.check_collision(self.current_block.get_x(), self.current_block.get_y() + 1):
+            self.shift_block(self.current_block.get_x(), self.current_block.get_y() + 1)
+
+
+    def check_lines(self, top=0, bottom=GAME_HEIGHT):
+        """Checks for full rows, clears them, and adds an empty row to the top of the matrix
+        A row is full when its bitmask equals FULL_ROW, so checking a row is a single comparison.
+
+        Args:
+            top (int, optional): the index of the first row to check. Defaults to 0.
+            bottom (int, optional): the index after the last row to check. Defaults to GAME_HEIGHT.
+        """
+        blocks = self.blocks
+        lines = [line_num for line_num in range(top, bottom) if blocks[line_num] == FULL_ROW]
+        if len(lines) != 0:
+            self.clear_lines(lines)
+
+
+    def clear_lines(self, lines):
+        """Clears all the lines in the main board given by the lines array
+        Adds the default 0 rows to the top for every cleared line
+        Calculates the points won and increases the score.
+
+        Args:
+            lines (array): A list containing the indeces of all the full rows, in ascending order
+        """
+        multiplier = len(lines)
+        blocks = self.blocks
+        # in a single pass: the empty rows, the rows above the cleared lines, the rows left between them
+        # (none when the lines are next to each other) and the rows below
+        first, last = lines[0], lines[-1]
+        if last - first + 1 == multiplier:
+            self.blocks = (EMPTY_ROW,) * multiplier + blocks[:first] + blocks[last + 1:]
+        else:
+            kept = tuple([row for row in blocks[first:last + 1] if row != FULL_ROW])
+            self.blocks = (EMPTY_ROW,) * multiplier + blocks[:first] + kept + blocks[last + 1:]
+        self.surface.clear(lines, self.blocks)
+        self.score += 10 * multiplier
+        self.lines_cleared += len(lines)
+        if (self.lines_cleared + 1) % 11 == 0:
+            self.timing /= 1.4
+        self.emit(SCORE_CHANGED)
+        self.emit(BOARD_CHANGED)
+
+
+    # Game features
+    def hard_drop(self):
+        """Drops Block straight down to the top of the accumulated blocks and locks it there
+        """
+        self.shift_block(self.current_block.get_x(), self.get_landing_row())
+        self.lock_block()
+
+
+    def get_landing_row(self):
+        """Returns the row the current block would lock at if dropped straight down, where the ghost block is drawn
+
+        Returns:
+            int: the index of the row of the top of the block once it has landed
+        """
+        return drop_row(self.blocks, self.surface.heights, self.current_block)
+
+
+    def hold_block(self):
+        """Moves block from main board to holding space
+        If applicable, swaps block from holding space with block in the main board
+        If there are no blocks in holding space, move current block and insert new block into main board.
+        The held block and can_hold are updated before the new block is brought in, so listeners of BLOCK_SPAWNED
+        (such as the bot planning the new block) see the hold already used.
+        """
+        if not self.can_hold:
+            return
+        block = self.current_block
+        block.update_x(START_X)
+        block.update_y(START_Y)
+        if self.block_held is None:
+            self.block_held = block
+            self.emit(HOLD_CHANGED)
+            self.get_new_block(can_hold=0)
+        else:
+            self.block_held, self.current_block = block, self.block_held
+            self.can_hold = 0
+            self.emit(HOLD_CHANGED)
+            self.insert_block_into_board(self.current_block.get_x(), self.current_block.get_y())
+            self.emit(BOARD_CHANGED)
+            if self.is_gameover():
+                self.end_game()
+
+
+    def get_self_blocks(self):
+        """Returns the rows of the saved main board before the last inserted block
+
+        Returns:
+            tuple of ints: Contains the row bitmasks of the last saved main board.
+        """
+        return self.blocks
+
+
+    def get_board(self):
+        """Returns the rows of the main board with the moving block drawn in, as displayed
+
+        Returns:
+            tuple of ints: the row bitmasks of the locked blocks and the current block
+        """
+        return overlay_block(self.blocks, self.current_block)
+
+
+    def get_current_blocks(self):
+        """Returns the current moving block or the last inserted block
+
+        Returns:
+            Block: the current block
+        """
+        return self.current_block
+
+
+class Block:
+    __slots__ = ("block_type", "rotation", "x", "y")
+
+    def __init__(self, x, y, block_type=None, rotation=0):
+        """Initializing the block class
+        Consists of:
+        - a block type (of the 7 tetris block shapes)
+        - the index of its orientation in ROTATIONS, the number of anticlockwise turns from the BLOCKS array
+        - horizontal coordinates of the block in the matrix as X
+        - vertical coordinates of the block in the matrix as y
+        The shape, height and width of every orientation are looked up in the shared ROTATIONS table.
+
+        Args:
+            x (int): the index of the column at which the block is to be inserted
+            y (int): the index of the row in the matrix at which the block is to be inserted
+            block_type (int, optional): index of the shape in the BLOCKS array. Defaults to a random shape.
+            rotation (int, optional): index of the orientation of the shape. Defaults to 0.
+        """
+        if block_type is None:
+            block_type = random.randint(0, NUM_OF_BLOCK_TYPES - 1)
+        self.block_type = block_type
+        self.rotation = rotation
+        self.x = x
+        self.y = y
+
+
+    def copy(self):
+        """Returns a new block with the same shape, rotation and position
+
+        Returns:
+            Block: the copy
+        """
+        return Block(self.x, self.y, self.block_type, self.rotation)
+
+
+    def orientation(self):
+        """Returns the precomputed data of the block in its current rotation
+
+        Returns:
+            Orientation: the shape, row bitmasks, cells and size of the block
+        """
+        return ROTATIONS[self.block_type][self.rotation]
+
+
+    def row_masks(self):
+        """Returns the row bitmasks of the block in its current rotation
+
+        Returns:
+            tuple of ints: one bitmask for every row of the block
+        """
+        return ROTATIONS[self.block_type][self.rotation].masks
+
+
+    def rotate_anticlockwise(self):
+        """Rotates the block anticlockwise preserving its shape"""
+        self.rotation = (self.rotation + 1) % 4
+
+
+    def rotate_clockwise(self):
+        """Rotates the block clockwise preserving its shape"""
+        self.rotation = (self.rotation - 1) % 4
+
+
+    def return_block(self):
+        """Returns the block permutation (can be either one of those from the BLOCKS array in any one of its rotated orientations)
+
+        Returns:
+            tuple of tuples: current block with its preserved rotation state
+        """
+        return ROTATIONS[self.block_type][self.rotation].block
+
+
+    def get_x(self):
+        """Gets the index of the column at which the block is
+
+        Returns:
+            int: the index of the column at which the block is
+        """
+        return self.x
+
+
+    def get_y(self):
+        """Gets the index of the row at which the block is
+
+        Returns:
+            int: the index of the column at which the block is
+        """
+        return self.y
+
+
+    def get_height(self):
+        """Gets the height of the block
+
+        Returns:
+            int: number of rows in the block permutation
+        """
+        return ROTATIONS[self.block_type][self.rotation].height
+
+
+    def get_width(self):
+        """Gets the width of the block
+
+        Returns:
+            int: number of columns in the block permutation
+        """
+        return ROTATIONS[self.block_type][self.rotation].width
+
+
+    def update_x(self,x):
+        """updates the index of the column at which the block is
+
+        Args:
+            x (int): the index of the column in the matrix that the block is
+        """
+        self.x = x
+
+
+    def update_y(self, y):
+        """updates the index of the row at which the block is
+
+        Args:
+            x (int): the index of the row in the matrix that the block is
+        """
+
+        self.y = y
+
+
+class Surface:
+    def __init__(self, rows=None):
+        """ Initializes the Surface Object
+        The height and the number of holes of every column of a board, kept up to date as blocks lock and rows clear,
+        so the shape of the surface can be read without scanning the board.
+        The height of a column is counted from the bottom of the board to its highest populated unit,
+        and a hole is an empty unit with a populated unit somewhere above it in its column.
+
+        Surface Object will have:
+        - the height of every column as heights, a tuple replaced on every change
+        - the number of holes of every column as holes, a tuple replaced on every change
+
+        Args:
+            rows (tuple of ints, optional): the row bitmasks of the board. Defaults to an empty board.
+        """
+        self.heights = (0,) * GAME_WIDTH
+        self.holes = (0,) * GAME_WIDTH
+        if rows is not None:
+            self.recompute(rows)
+
+
+    def recompute(self, rows):
+        """ Measures every column of a board by scanning its rows once from the top
+
+        Args:
+            rows (tuple of ints): the row bitmasks of the board
+        """
+        heights, holes = [0] * GAME_WIDTH, [0] * GAME_WIDTH
+        covered = 0
+        for y, row in enumerate(rows):
+            new = row & ~covered
+            while new:
+                lowest = new & -new
+                heights[lowest.bit_length() - 1] = GAME_HEIGHT - y
+                new ^= lowest
+            covered |= row
+            empty = covered & ~row
+            while empty:
+                lowest = empty & -empty
+                holes[lowest.bit_length() - 1] += 1
+                empty ^= lowest
+        self.heights, self.holes = tuple(heights), tuple(holes)
+
+
+    def copy(self):
+        """ Returns a new surface with the same heights and holes, without measuring the board again
+
+        Returns:
+            Surface: the copy
+        """
+        surface = Surface()
+        surface.heights, surface.holes = self.heights, self.holes
+        return surface
+
+
+    def lock(self, block):
+        """ Updates the columns covered by a block locked at its position, before any line is cleared.
+        A unit of the block below the top of its column fills a hole, and the empty units left
+        between the old top and the new one become holes.
+        The units of a Tetris block in one column are always next to each other, from its top to its bottom offset.
+
+        Args:
+            block (Block): the locked block
+        """
+        heights, holes = list(self.heights), list(self.holes)
+        orientation = ROTATIONS[block.block_type][block.rotation]
+        x, y = block.x, block.y
+        for width, bottom in enumerate(orientation.bottoms):
+            column = x + width
+            top = GAME_HEIGHT - heights[column]
+            first, last = y + orientation.tops[width], y + bottom
+            above = 0
+            if first < top:
+                above = min(last + 1, top) - first
+                holes[column] += (top - first) - above
+                heights[column] = GAME_HEIGHT - first
+            holes[column] -= last - first + 1 - above
+        self.heights, self.holes = tuple(heights), tuple(holes)
+
+
+    def clear(self, lines, rows):
+        """ Updates every column after full rows were cleared.
+        A full row holds no hole and every cleared row is at or below the top of every column,
+        so a column whose top row is left is only lowered by the number of lines.
+        A column whose top row was cleared is empty down to its old top plus the number of lines in the new rows:
+        from there, the empty units until its new top were holes and are not anymore.
+
+        Args:
+            lines (list of ints): the indices of the cleared rows, before clearing
+            rows (tuple of ints): the row bitmasks of the board, after clearing
+        """
+        lowered = len(lines)
+        heights, holes = list(self.heights), list(self.holes)
+        for column in range(GAME_WIDTH):
+            top = GAME_HEIGHT - heights[column]
+            if top in lines:
+                bit = 1 << column
+                y = top + lowered
+                while y < GAME_HEIGHT and not rows[y] & bit:
+                    y += 1
+                    holes[column] -= 1
+                heights[column] = GAME_HEIGHT - y
+            else:
+                heights[column] -= lowered
+        self.heights, self.holes = tuple(heights), tuple(holes)
+
+
+    def aggregate_height(self):
+        """ Gets the sum of the heights of every column
+
+        Returns:
+            int: the aggregate height
+        """
+        return sum(self.heights)
+
+
+    def total_holes(self):
+        """ Gets the number of holes of the whole board
+
+        Returns:
+            int: the number of holes
+        """
+        return sum(self.holes)
+
+
+    def bumpiness(self):
+        """ Gets the sum of the height differences between neighbouring columns
+
+        Returns:
+            int: the bumpiness
+        """
+        heights = self.heights
+        return sum(abs(heights[column] - heights[column + 1]) for column in range(GAME_WIDTH - 1))
+
+
+    def wells(self):
+        """ Gets the depth of the well of every column, how far it is below its lower neighbour (the walls being infinitely high)
+
+        Returns:
+            tuple of ints: the depth of every column, 0 if a neighbour is not higher
+        """
+        heights = (GAME_HEIGHT,) + self.heights + (GAME_HEIGHT,)
+        return tuple(max(0, min(heights[column], heights[column + 2]) - heights[column + 1]) for column in range(GAME_WIDTH))
+
+
+    def landing_row(self, orientation, x):
+        """ Computes the row a block lands at when dropped from above the highest units of its columns
+
+        Args:
+            orientation (Orientation): the block in its rotation
+            x (int): the column of the left side of the block
+
+        Returns:
+            int: the row of the top of the block once it has landed, negative if it does not fit on the board
+        """
+        return landing_row(self.heights, orientation, x)
+
+
+class PieceSource:
+    def __init__(self, seed=None, mode=UNIFORM):
+        """ Initializes the PieceSource Object
+        A reproducible sequence of block types for a game.
+
+        PieceSource Object will have:
+        - the seed the sequence is generated from, so the same seed always gives the same blocks
+        - the mode the block types are picked with:
+            - UNIFORM: every block type is picked independently at random (the original behaviour)
+            - BAG: the 7 block types are shuffled into a bag and dealt one by one before a new bag is shuffled
+        - its own random number generator, so other uses of the random module do not change the sequence
+        - a queue of block types that were generated ahead of time but not handed out yet
+
+        Args:
+            seed (int, optional): the seed of the sequence. Defaults to a random seed.
+            mode (str, optional): UNIFORM or BAG. Defaults to UNIFORM.
+        """
+        if mode not in PIECE_MODES:
+            raise ValueError(f"Unknown piece mode: {mode}")
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        self.seed = seed
+        self.mode = mode
+        self.random = random.Random(seed)
+        self.queue = deque()
+
+
+    def fill(self, count):
+        """ Generates block types ahead of time until at least count of them are queued
+
+        Args:
+            count (int): the number of block types that should be queued
+        """
+        while len(self.queue) < count:
+            if self.mode == BAG:
+                bag = list(range(NUM_OF_BLOCK_TYPES))
+                self.random.shuffle(bag)
+                self.queue.extend(bag)
+            else:
+                self.queue.append(self.random.randint(0, NUM_OF_BLOCK_TYPES - 1))
+
+
+    def peek(self, count=1):
+        """ Gets the upcoming block types without handing them out
+
+        Args:
+            count (int, optional): how many block types to look ahead. Defaults to 1.
+
+        Returns:
+            list of ints: the next count block types, in the order they will be handed out
+        """
+        self.fill(count)
+        return [self.queue[i] for i in range(count)]
+
+
+    def take(self, count):
+        """ Hands out the next block types in bulk
+
+        Args:
+            count (int): the number of block types to hand out
+
+        Returns:
+            list of ints: the next count block types
+        """
+        self.fill(count)
+        return [self.queue.popleft() for _ in range(count)]
+
+
+    def next_type(self):
+        """ Hands out the next block type
+
+        Returns:
+            int: index of the next shape in the BLOCKS array
+        """
+        if not self.queue:
+            self.fill(1)
+        return self.queue.popleft()
+
+
+    def next_block(self, x=START_X, y=START_Y):
+        """ Creates a Block object of the next block type
+
+        Args:
+            x (int, optional): the index of the column at which the block is to be inserted. Defaults to START_X.
+            y (int, optional): the index of the row at which the block is to be inserted. Defaults to START_Y.
+
+        Returns:
+            Block: the next block of the sequence
+        """
+        return Block(x, y, self.next_type())
+
+
+def create_orientation(block):
+    """Computes the precomputed data of one orientation of a block
+
+    Args:
+        block (list of lists): the 1s and 0s of the block in this orientation
+
+    Returns:
+        Orientation: the shape, row bitmasks, cells, size and bottom profile of the orientation
+    """
+    shape = tuple(tuple(row) for row in block)
+    masks = tuple(sum(1 << width for width, is_block in enumerate(row) if is_block) for row in block)
+    cells = tuple((width, height) for height, row in enumerate(block) for width, is_block in enumerate(row) if is_block)
+    bottoms = tuple(max(height for height in range(len(block)) if block[height][width]) for width in range(len(block[0])))
+    tops = tuple(min(height for height in range(len(block)) if block[height][width]) for width in range(len(block[0])))
+    return Orientation(shape, masks, cells, len(block[0]), len(block), bottoms, tops)
+
+
+def create_rotations(block):
+    """Computes the 4 orientations of a block, each one turned anticlockwise from the previous one
+
+    Args:
+        block (list of lists): the 1s and 0s of the block, as found in the BLOCKS array
+
+    Returns:
+        tuple of Orientations: the orientations of the block, indexed by the number of anticlockwise turns
+    """
+    orientations = []
+    for _ in range(4):
+        orientations.append(create_orientation(block))
+        block = [[block[j][i] for j in range(len(block))] for i in range(len(block[0]) - 1, -1, -1)]
+    return tuple(orientations)
+
+
+def landing_row(heights, orientation, x):
+    """Computes the row a block lands at when dropped from above the highest units of its columns
+
+    Args:
+        heights (tuple of ints): the height of every column
+        orientation (Orientation): the block in its rotation
+        x (int): the column of the left side of the block
+
+    Returns:
+        int: the row of the top of the block once it has landed, negative if it does not fit on the board
+    """
+    return min(GAME_HEIGHT - heights[x + width] - 1 - bottom for width, bottom in enumerate(orientation.bottoms))
+
+
+def drop_row(rows, heights, block):
+    """Computes the row a block lands at when dropped straight down from its position.
+    When the block is above the highest unit of every column it covers, the distance is read from the heights and
+    the bottom profile of the block. Otherwise (the block is tucked under an overhang) the rows below it are scanned.
+
+    Args:
+        rows (tuple of ints): the row bitmasks of the locked blocks
+        heights (tuple of ints): the height of every column of the locked blocks
+        block (Block): the block to drop, at its own position
+
+    Returns:
+        int: the index of the row of the top of the block once it has landed
+    """
+    orientation = ROTATIONS[block.block_type][block.rotation]
+    x, y = block.x, block.y
+    for width, bottom in enumerate(orientation.bottoms):
+        if y + bottom >= GAME_HEIGHT - heights[x + width]:
+            break
+    else:
+        return landing_row(heights, orientation, x)
+    masks = orientation.masks
+    while y + len(masks) < GAME_HEIGHT and not any(rows[y + 1 + height] & (mask << x) for height, mask in enumerate(masks)):
+        y += 1
+    return y
+
+
+def overlay_block(rows, block):
+    """Draws a block over the rows of a board, without changing them
+
+    Args:
+        rows (tuple of ints): the row bitmasks of the board
+        block (Block): the block to draw, at its own position
+
+    Returns:
+        tuple of ints: the new rows, sharing every row the block does not cover
+    """
+    rows = list(rows)
+    x, y = block.x, block.y
+    for height, mask in enumerate(block.row_masks()):
+        rows[y + height] |= mask << x
+    return tuple(rows)
+
+
+# All 4 orientations of every block in BLOCKS, computed once and shared by every Block object
+ROTATIONS = tuple(create_rotations(block) for block in BLOCKS)
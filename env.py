@@ -0,0 +1,263 @@
+import multiprocessing
+from collections import namedtuple
+
+from engine import Engine, PieceSource, UNIFORM, ACTIONS, GRAVITY
+
+NO_BLOCK = -1
+
+# What an agent sees after every step. board is the engine's own tuple of row bitmasks of the locked blocks,
+# handed out without copying as the engine replaces that tuple instead of changing it. The moving block is given
+# by its type, rotation and x/y, like in BatchVectorEnv.
+Observation = namedtuple("Observation", ["board", "block_type", "rotation", "x", "y", "next_type", "held_type"])
+
+
+class TetrisEnv:
+    def __init__(self, mode=UNIFORM, gravity_every=1, max_steps=None):
+        """ Initializes the TetrisEnv Object
+        A reinforcement learning environment around one Engine, following the Gym reset/step API.
+
+        TetrisEnv Object will have:
+        - the mode of the PieceSource of every game
+        - how many steps pass between two gravity moves, as gravity has no clock to follow here
+        - the number of steps after which a game is cut short (if applicable)
+        - the Engine object of the current game, the number of steps taken in it and its last score
+
+        Args:
+            mode (str, optional): the mode of the PieceSource. Defaults to UNIFORM.
+            gravity_every (int, optional): apply a gravity move after every this many steps, None for no gravity. Defaults to 1.
+            max_steps (int, optional): the number of steps after which the game is truncated. Defaults to None.
+        """
+        self.mode = mode
+        self.gravity_every = gravity_every
+        self.max_steps = max_steps
+        self.action_count = len(ACTIONS)
+        self.engine = None
+        self.steps = 0
+        self.last_score = 0
+
+
+    def reset(self, seed=None):
+        """ Starts a new game
+
+        Args:
+            seed (int, optional): the seed of the blocks of the game. Defaults to a random seed.
+
+        Returns:
+            tuple: the first Observation of the game and the info dict
+        """
+        self.engine = Engine(PieceSource(seed, self.mode))
+        self.engine.start()
+        self.steps = 0
+        self.last_score = 0
+        return self.observe(), self.info()
+
+
+    def step(self, action):
+        """ Applies an action to the game
+
+        Args:
+            action (int): one of the actions of the engine
+
+        Returns:
+            tuple: (Observation, reward, terminated, truncated, info). The reward is the score gained
+            by the step, terminated is True once the game is over and truncated once max_steps were taken.
+        """
+        engine = self.engine
+        engine.step(action)
+        self.steps += 1
+        if self.gravity_every and self.steps % self.gravity_every == 0:
+            engine.step(GRAVITY)
+        reward = engine.score - self.last_score
+        self.last_score = engine.score
+        truncated = self.max_steps is not None and self.steps >= self.max_steps
+        return self.observe(), reward, engine.over, truncated, self.info()
+
+
+    def observe(self):
+        """ Gets what the agent sees of the game, without copying the board
+
+        Returns:
+            Observation: the board of locked blocks, the moving block and the next and held block types
+        """
+        engine = self.engine
+        block = engine.current_block
+        held_type = NO_BLOCK if engine.block_held is None else engine.block_held.block_type
+        return Observation(engine.blocks, block.block_type, block.rotation, block.x, block.y,
+                           engine.next_block.block_type, held_type)
+
+
+    def info(self):
+        """ Gets the statistics of the game
+
+        Returns:
+            dict: the score, the number of lines cleared and the number of steps taken
+        """
+        return {"score": self.engine.score, "lines_cleared": self.engine.lines_cleared, "steps": self.steps}
+
+
+class BatchVectorEnv:
+    def __init__(self, num_envs, mode=UNIFORM, gravity_every=1, max_steps=None):
+        """ Initializes the BatchVectorEnv Object
+        Many environments stepped together in this process by a BatchEngine (needs NumPy).
+        Games that are over stay over until the next reset.
+
+        Args:
+            num_envs (int): the number of games
+            mode (str, optional): the mode of the PieceSources. Defaults to UNIFORM.
+            gravity_every (int, optional): apply a gravity move after every this many steps, None for no gravity. Defaults to 1.
+            max_steps (int, optional): the number of steps after which the games are truncated. Defaults to None.
+        """
+        import numpy as np
+        self.np = np
+        self.num_envs = num_envs
+        self.mode = mode
+        self.gravity_every = gravity_every
+        self.max_steps = max_steps
+        self.action_count = len(ACTIONS)
+        self.batch = None
+        self.steps = 0
+        self.last_score = None
+
+
+    def reset(self, seed=0):
+        """ Starts new games, game i drawing its blocks from seed + i
+
+        Args:
+            seed (int, optional): the seed of the first game. Defaults to 0.
+
+        Returns:
+            tuple: the observations and the info dict
+        """
+        from batch_engine import BatchEngine
+        self.batch = BatchEngine(self.num_envs, seed, self.mode)
+        self.batch.start()
+        self.steps = 0
+        self.last_score = self.batch.score.copy()
+        return self.observe(), self.info()
+
+
+    def step(self, actions):
+        """ Applies one action to every game
+
+        Args:
+            actions (array of ints): the action of each game
+
+        Returns:
+            tuple: (observations, rewards, terminated, truncated, info), each holding one entry per game
+        """
+        batch = self.batch
+        batch.step(actions)
+        self.steps += 1
+        if self.gravity_every and self.steps % self.gravity_every == 0:
+            batch.step(self.np.full(self.num_envs, GRAVITY))
+        rewards = batch.score - self.last_score
+        self.last_score = batch.score.copy()
+        truncated = self.np.full(self.num_envs, self.max_steps is not None and self.steps >= self.max_steps)
+        return self.observe(), rewards, batch.over.copy(), truncated, self.info()
+
+
+    def observe(self):
+        """ Gets what the agents see of the games. The arrays are the BatchEngine's own, updated in place by every step.
+        Like TetrisEnv, the board only holds the locked blocks: the moving block is given by its type, rotation and x/y.
+
+        Returns:
+            dict: the row bitmasks of the locked blocks as board, and the moving, next and held blocks of every game
+        """
+        batch = self.batch
+        return {"board": batch.blocks, "block_type": batch.block_type, "rotation": batch.rotation,
+                "x": batch.x, "y": batch.y, "next_type": batch.next_type, "held_type": batch.held_type}
+
+
+    def info(self):
+        """ Gets the statistics of the games
+
+        Returns:
+            dict: the score and number of lines cleared of every game and the number of steps taken
+        """
+        return {"score": self.batch.score, "lines_cleared": self.batch.lines_cleared, "steps": self.steps}
+
+
+def run_worker(connection, mode, gravity_every, max_steps):
+    """Runs a TetrisEnv in a subprocess, answering the commands sent by a SubprocVectorEnv
+
+    Args:
+        connection (Connection): the worker's end of the pipe
+        mode (str): the mode of the PieceSource
+        gravity_every (int): apply a gravity move after every this many steps
+        max_steps (int): the number of steps after which the game is truncated
+    """
+    env = TetrisEnv(mode, gravity_every, max_steps)
+    while True:
+        command, value = connection.recv()
+        if command == "reset":
+            connection.send(env.reset(value))
+        elif command == "step":
+            connection.send(env.step(value))
+        elif command == "close":
+            connection.close()
+            return
+
+
+class SubprocVectorEnv:
+    def __init__(self, num_envs, mode=UNIFORM, gravity_every=1, max_steps=None):
+        """ Initializes the SubprocVectorEnv Object
+        Many TetrisEnv objects, each one stepped in its own process so they run on all cores.
+        Observations are pickled through a pipe, so unlike TetrisEnv they are copies.
+
+        Args:
+            num_envs (int): the number of games
+            mode (str, optional): the mode of the PieceSources. Defaults to UNIFORM.
+            gravity_every (int, optional): apply a gravity move after every this many steps, None for no gravity. Defaults to 1.
+            max_steps (int, optional): the number of steps after which the games are truncated. Defaults to None.
+        """
+        self.num_envs = num_envs
+        self.action_count = len(ACTIONS)
+        self.connections = []
+        self.processes = []
+        for _ in range(num_envs):
+            connection, worker_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=run_worker, args=(worker_connection, mode, gravity_every, max_steps), daemon=True)
+            process.start()
+            worker_connection.close()
+            self.connections.append(connection)
+            self.processes.append(process)
+
+
+    def reset(self, seed=0):
+        """ Starts new games, game i drawing its blocks from seed + i
+
+        Args:
+            seed (int, optional): the seed of the first game. Defaults to 0.
+
+        Returns:
+            tuple: the list of observations and the list of info dicts
+        """
+        for i, connection in enumerate(self.connections):
+            connection.send(("reset", seed + i))
+        observations, infos = zip(*[connection.recv() for connection in self.connections])
+        return list(observations), list(infos)
+
+
+    def step(self, actions):
+        """ Applies one action to every game, the games stepping in parallel
+
+        Args:
+            actions (list of ints): the action of each game
+
+        Returns:
+            tuple: (observations, rewards, terminated, truncated, infos), each a list with one entry per game
+        """
+        for connection, action in zip(self.connections, actions):
+            connection.send(("step", int(action)))
+        results = zip(*[connection.recv() for connection in self.connections])
+        return tuple(list(result) for result in results)
+
+
+    def close(self):
+        """ Stops the worker processes
+        """
+        for connection in self.connections:
+            connection.send(("close", None))
+            connection.close()
+        for process in self.processes:
+            process.join()
@@ -0,0 +1,163 @@
+import json
+import time
+
+from screen import KEY_LEFT, KEY_RIGHT, KEY_UP, KEY_DOWN
+
+# Names of the keys in a key script, any other single character standing for itself
+KEY_NAMES = {"LEFT": KEY_LEFT,
+             "RIGHT": KEY_RIGHT,
+             "UP": KEY_UP,
+             "DOWN": KEY_DOWN,
+             "SPACE": ord(' ')}
+
+PERCENTILES = (50, 95, 99)
+
+
+def load_script(path):
+    """Reads a key script: one "<milliseconds since the start> <key>" per line, blank lines and # comments ignored
+
+    Args:
+        path (str): the script file
+
+    Returns:
+        list of tuples: (milliseconds since the start of the game, key code) of every key, in the order of the file
+    """
+    keys = []
+    with open(path) as file:
+        for number, line in enumerate(file, 1):
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            try:
+                time_ms, name = line.split()
+                key = KEY_NAMES[name] if name in KEY_NAMES else ord(name) if len(name) == 1 else None
+                if key is None:
+                    raise ValueError
+                keys.append((int(time_ms), key))
+            except ValueError:
+                raise ValueError(f"Invalid key script line {number}: {line}")
+    return keys
+
+
+def percentile(values, percent):
+    """Gets a percentile of a list of numbers, by the nearest rank
+
+    Args:
+        values (list of numbers): the numbers, sorted
+        percent (float): the percentile, between 0 and 100
+
+    Returns:
+        the number at the percentile, 0 if the list is empty
+    """
+    if not values:
+        return 0
+    rank = max(1, -(-percent * len(values) // 100))
+    return values[int(rank) - 1]
+
+
+class LatencyMeter:
+    def __init__(self, clock=time.perf_counter):
+        """ Initializes the LatencyMeter Object
+        Measures the time from a key being read by getch to the frame showing its effect being flushed to the terminal.
+        A key is read as soon as the game loop is waiting in getch, so the time it spent queued before that is not counted.
+
+        LatencyMeter Object will have:
+        - the clock the keys and flushes are timed with
+        - the read times of the keys still waiting for a frame
+        - the latency of every key that reached the screen, in seconds
+        - the number of keys read, the number of keys that shared their flush with an earlier key (coalesced)
+          and the number of keys that changed nothing on the screen (dropped)
+
+        Args:
+            clock (callable, optional): returns the current time in seconds. Defaults to time.perf_counter.
+        """
+        self.clock = clock
+        self.pending = []
+        self.latencies = []
+        self.keys = 0
+        self.coalesced = 0
+        self.dropped = 0
+
+
+    def key_read(self):
+        """ Timestamps a key returned by getch
+        """
+        self.keys += 1
+        self.pending.append(self.clock())
+
+
+    def frame_done(self, flushed):
+        """ Resolves the keys waiting for a frame, once it has been drawn
+
+        Args:
+            flushed (bool): whether the frame changed anything on the terminal
+        """
+        if not self.pending:
+            return
+        if flushed:
+            now = self.clock()
+            self.latencies.extend(now - read for read in self.pending)
+            self.coalesced += len(self.pending) - 1
+        else:
+            self.dropped += len(self.pending)
+        self.pending.clear()
+
+
+    def instrument(self, board):
+        """ Timestamps the keys handled by a Board and the flushes of its frames
+
+        Args:
+            board (Board): the display of the game
+        """
+        handle_key, flush = board.handle_key, board.flush
+
+        def timed_handle_key(key):
+            if key != -1:
+                self.key_read()
+            handle_key(key)
+
+        def timed_flush():
+            flushed = board.needs_flush
+            flush()
+            # with no action left to apply and no frame scheduled either, the keys waiting for one changed nothing on the screen
+            if flushed or (not board.dirty and board.render_timer is None and not board.engine.has_commands()):
+                self.frame_done(flushed)
+
+        board.handle_key = timed_handle_key
+        board.flush = timed_flush
+
+
+    def report(self):
+        """ Gets the results of the measurement
+
+        Returns:
+            dict: the number of keys read, shown, coalesced and dropped, and the mean and percentiles of the latency in milliseconds
+        """
+        latencies = sorted(self.latencies)
+        report = {"keys": self.keys,
+                  "shown": len(latencies),
+                  "coalesced": self.coalesced,
+                  "dropped": self.dropped,
+                  "mean_ms": sum(latencies) / len(latencies) * 1000 if latencies else 0.0}
+        for percent in PERCENTILES:
+            report[f"p{percent}_ms"] = percentile(latencies, percent) * 1000
+        return report
+
+
+    def print_report(self):
+        """ Prints the results of the measurement
+        """
+        report = self.report()
+        print(f"Keys: {report['keys']} read, {report['shown']} shown, {report['coalesced']} coalesced, {report['dropped']} dropped")
+        print("Input latency: " + "  ".join(f"p{percent} {report[f'p{percent}_ms']:.2f}ms" for percent in PERCENTILES) +
+              f"  mean {report['mean_ms']:.2f}ms")
+
+
+    def dump(self, path):
+        """ Writes the results of the measurement as JSON
+
+        Args:
+            path (str): the file to write to
+        """
+        with open(path, "w") as file:
+            json.dump(self.report(), file, indent=2)
@@ -171,12 +171,7 @@ class Board:
 		board2_lines = board2.split('\n')
 
 		assert len(board1_lines) == len(board2_lines)
-		new_board = ""
-		for y in range(len(board1_lines)):
-			new_board += board1_lines[y]
-			new_board += board2_lines[y]
-			new_board += '\n'
-		return new_board[:-1]
+		return '\n'.join([line1 + line2 for line1, line2 in zip(board1_lines, board2_lines)])
 
 	def pad_board_vertical(self, board, width):
 		board_height = len(board.split('\n'))
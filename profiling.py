@@ -0,0 +1,170 @@
+import json
+import time
+
+# Number of power of 2 buckets of a Histogram, the last one holding every duration of 2**(BUCKETS - 2) ns and more
+BUCKETS = 40
+
+# The phases of a frame timed by Profiler.instrument, and the method of the Board or Engine timing each one.
+# Input is the queued actions being applied by the game loop; keys and the bot only queue them.
+# The phases nest: collisions are checked and blocks locked while applying input, and line clears happen while locking.
+PHASES = (("input", "engine", "process_commands"),
+          ("collision", "engine", "check_collision"),
+          ("lock", "engine", "lock_block"),
+          ("line_clear", "engine", "check_lines"),
+          ("draw", "board", "update_main_board"),
+          ("refresh", "board", "flush"))
+
+
+class Histogram:
+    def __init__(self):
+        """ Initializes the Histogram Object
+        Counts durations in power of 2 buckets of nanoseconds: bucket i holds the durations d with d.bit_length() == i,
+        so adding a duration costs a few int operations.
+
+        Histogram Object will have:
+        - the count of durations in every bucket
+        - the number of durations, their total and the longest one, in nanoseconds
+        """
+        self.buckets = [0] * BUCKETS
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+
+    def add(self, duration):
+        """ Counts a duration
+
+        Args:
+            duration (int): the duration in nanoseconds
+        """
+        self.buckets[min(duration.bit_length(), BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += duration
+        if duration > self.max:
+            self.max = duration
+
+
+    def mean(self):
+        """ Gets the mean of the durations
+
+        Returns:
+            float: the mean in nanoseconds, 0 if nothing was counted
+        """
+        return self.total / self.count if self.count else 0.0
+
+
+    def percentile(self, percent):
+        """ Estimates a percentile of the durations from the buckets
+
+        Args:
+            percent (float): the percentile, between 0 and 100
+
+        Returns:
+            int: the upper bound in nanoseconds of the bucket holding the percentile, 0 if nothing was counted
+        """
+        if not self.count:
+            return 0
+        rank = percent / 100 * self.count
+        seen = 0
+        for bucket, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank and count:
+                return min(1 << bucket, self.max)
+        return self.max
+
+
+    def to_dict(self):
+        """ Gets the histogram as plain data
+
+        Returns:
+            dict: the count, total, mean, max and estimated p50/p95/p99 in nanoseconds,
+            and the non empty buckets keyed by their upper bound in nanoseconds
+        """
+        return {"count": self.count,
+                "total_ns": self.total,
+                "mean_ns": self.mean(),
+                "max_ns": self.max,
+                "p50_ns": self.percentile(50),
+                "p95_ns": self.percentile(95),
+                "p99_ns": self.percentile(99),
+                "buckets": {1 << bucket: count for bucket, count in enumerate(self.buckets) if count}}
+
+
+class Profiler:
+    def __init__(self, clock=time.perf_counter_ns):
+        """ Initializes the Profiler Object
+        Times the hot methods of a game into one Histogram per phase.
+        Nothing is timed until instrument is called: the methods are then wrapped on the instances only,
+        so a game that is not profiled runs the plain methods with no overhead at all.
+
+        Args:
+            clock (callable, optional): returns the current time in nanoseconds. Defaults to time.perf_counter_ns.
+        """
+        self.clock = clock
+        self.histograms = {}
+
+
+    def wrap(self, obj, name, phase):
+        """ Replaces a method of an object with one that times every call into the histogram of a phase
+
+        Args:
+            obj (object): the instance whose method is timed
+            name (str): the name of the method
+            phase (str): the phase the calls are counted in
+        """
+        method = getattr(obj, name)
+        histogram = self.histograms.setdefault(phase, Histogram())
+        clock = self.clock
+
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                histogram.add(clock() - start)
+
+        setattr(obj, name, timed)
+
+
+    def instrument(self, board):
+        """ Times every phase in PHASES of a Board and its Engine.
+        Must be called before the game starts, as the scheduled actions keep the methods they were scheduled with.
+
+        Args:
+            board (Board): the display of the game, with its engine
+        """
+        owners = {"board": board, "engine": board.engine}
+        for phase, owner, name in PHASES:
+            self.wrap(owners[owner], name, phase)
+
+
+    def report(self):
+        """ Describes every phase in a line of text
+
+        Returns:
+            list of str: the header and one line per phase, with the call count and the mean, p95 and max in microseconds
+        """
+        lines = [f"{'phase':<11}{'calls':>8}{'mean us':>10}{'p95 us':>10}{'max us':>10}"]
+        for phase, histogram in self.histograms.items():
+            lines.append(f"{phase:<11}{histogram.count:>8}{histogram.mean() / 1000:>10.1f}"
+                         f"{histogram.percentile(95) / 1000:>10.1f}{histogram.max / 1000:>10.1f}")
+        return lines
+
+
+    def to_dict(self):
+        """ Gets the histograms of every phase as plain data
+
+        Returns:
+            dict: the name of every phase mapped to Histogram.to_dict
+        """
+        return {phase: histogram.to_dict() for phase, histogram in self.histograms.items()}
+
+
+    def dump(self, path):
+        """ Writes the histograms of every phase as JSON
+
+        Args:
+            path (str): the file to write to
+        """
+        with open(path, "w") as file:
+            json.dump(self.to_dict(), file, indent=2)
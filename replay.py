@@ -0,0 +1,242 @@
+import argparse
+import time
+
+from engine import Engine, PieceSource, UNIFORM, BAG, ACTIONS
+
+# File layout: MAGIC, VERSION, mode byte, varint seed, then one varint per action
+# holding the milliseconds since the previous action shifted left by ACTION_BITS, OR'd with the action
+MAGIC = b"PTRP"
+VERSION = 1
+ACTION_BITS = 4
+ACTION_MASK = (1 << ACTION_BITS) - 1
+# MAGIC, VERSION and the mode byte, the fixed part of the header before the seed
+HEADER_SIZE = len(MAGIC) + 2
+MODE_CODES = {UNIFORM: 0, BAG: 1}
+CODE_MODES = {code: mode for mode, code in MODE_CODES.items()}
+
+
+def write_varint(buffer, value):
+    """Appends an unsigned int to the buffer, 7 bits per byte with the high bit set on all but the last byte
+
+    Args:
+        buffer (bytearray): the buffer to write to
+        value (int): the unsigned int to write
+    """
+    while value > 0x7f:
+        buffer.append((value & 0x7f) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def read_varint(data, pos):
+    """Reads an unsigned int written by write_varint
+
+    Args:
+        data (bytes): the encoded data
+        pos (int): the index of the first byte of the int
+
+    Returns:
+        tuple: the int that was read and the index of the byte after it
+    """
+    value = shift = 0
+    while True:
+        if pos >= len(data):
+            raise ValueError("Truncated replay")
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+
+
+class Recorder:
+    def __init__(self, piece_source, clock=time.monotonic):
+        """ Initializes the Recorder Object
+        Records the actions applied to a game so it can be played back later.
+        Only the seed of the blocks and the timed actions are kept, never the board itself.
+        The seed is saved as an unsigned varint, so games with a negative seed cannot be recorded.
+
+        Recorder Object will have:
+        - the seed and mode of the PieceSource the game draws its blocks from
+        - the clock the actions are timed with and the time of the previous action
+        - the encoded actions recorded so far
+
+        Args:
+            piece_source (PieceSource): the sequence of blocks of the recorded game
+            clock (callable, optional): returns the current time in seconds. Defaults to time.monotonic.
+        """
+        if piece_source.seed < 0:
+            raise ValueError(f"Cannot record a game with a negative seed: {piece_source.seed}")
+        self.seed = piece_source.seed
+        self.mode = piece_source.mode
+        self.clock = clock
+        self.last_time = None
+        self.data = bytearray()
+
+
+    def start(self):
+        """ Starts timing the actions from now, called when the recorded game starts
+        """
+        self.last_time = self.clock()
+
+
+    def record(self, action):
+        """ Records an action applied to the game
+
+        Args:
+            action (int): one of the actions in ACTIONS
+        """
+        now = self.clock()
+        if self.last_time is None:
+            self.last_time = now
+        delta = max(0, round((now - self.last_time) * 1000))
+        self.last_time += delta / 1000
+        write_varint(self.data, delta << ACTION_BITS | action)
+
+
+    def to_bytes(self):
+        """ Encodes the recording
+
+        Returns:
+            bytes: the header followed by the recorded actions
+        """
+        header = bytearray(MAGIC)
+        header.append(VERSION)
+        header.append(MODE_CODES[self.mode])
+        write_varint(header, self.seed)
+        return bytes(header + self.data)
+
+
+    def save(self, path):
+        """ Writes the recording to a file
+
+        Args:
+            path (str): the file to write to
+        """
+        with open(path, "wb") as file:
+            file.write(self.to_bytes())
+
+
+class Replay:
+    def __init__(self, seed, mode, events):
+        """ Initializes the Replay Object
+        A recorded game that can be rebuilt frame by frame.
+
+        Args:
+            seed (int): the seed of the PieceSource of the recorded game
+            mode (str): the mode of the PieceSource of the recorded game
+            events (list of tuples): (milliseconds since the start of the game, action) for every recorded action
+        """
+        self.seed = seed
+        self.mode = mode
+        self.events = events
+
+
+    @classmethod
+    def from_bytes(cls, data):
+        """ Decodes a recording made by Recorder.to_bytes
+
+        Args:
+            data (bytes): the encoded recording
+
+        Returns:
+            Replay: the decoded recording
+        """
+        if len(data) < HEADER_SIZE or data[:len(MAGIC)] != MAGIC:
+            raise ValueError("Not a replay file")
+        pos = len(MAGIC)
+        if data[pos] != VERSION:
+            raise ValueError(f"Unsupported replay version: {data[pos]}")
+        if data[pos + 1] not in CODE_MODES:
+            raise ValueError(f"Unknown mode in replay: {data[pos + 1]}")
+        mode = CODE_MODES[data[pos + 1]]
+        seed, pos = read_varint(data, HEADER_SIZE)
+        events = []
+        time_ms = 0
+        while pos < len(data):
+            value, pos = read_varint(data, pos)
+            action = value & ACTION_MASK
+            if action not in ACTIONS:
+                raise ValueError(f"Unknown action in replay: {action}")
+            time_ms += value >> ACTION_BITS
+            events.append((time_ms, action))
+        return cls(seed, mode, events)
+
+
+    @classmethod
+    def load(cls, path):
+        """ Reads a recording from a file
+
+        Args:
+            path (str): the file written by Recorder.save
+
+        Returns:
+            Replay: the decoded recording
+        """
+        with open(path, "rb") as file:
+            return cls.from_bytes(file.read())
+
+
+    def create_engine(self):
+        """ Creates a new game with the same blocks as the recorded game
+
+        Returns:
+            Engine: the game, not started yet
+        """
+        return Engine(PieceSource(self.seed, self.mode))
+
+
+    def frames(self, engine=None):
+        """ Replays the recorded actions as fast as possible, without rendering
+
+        Args:
+            engine (Engine, optional): a new game created by create_engine. Defaults to creating one.
+
+        Yields:
+            tuple: (milliseconds since the start of the game, GameState) after every recorded action,
+            each GameState a snapshot that later actions do not change
+        """
+        if engine is None:
+            engine = self.create_engine()
+        engine.start()
+        yield 0, engine.snapshot()
+        for time_ms, action in self.events:
+            engine.step(action)
+            yield time_ms, engine.snapshot()
+
+
+    def fast_forward(self, frame=None):
+        """ Rebuilds the game as it was after a given number of recorded actions
+
+        Args:
+            frame (int, optional): the number of actions to apply. Defaults to all of them.
+
+        Returns:
+            Engine: the game after the actions were applied
+        """
+        engine = self.create_engine()
+        engine.start()
+        for _, action in self.events[:frame]:
+            engine.step(action)
+        return engine
+
+
+def main():
+    """Prints the outcome of a recorded game, rebuilt without rendering
+    """
+    parser = argparse.ArgumentParser(description="Fast-forward a recorded Tetris game")
+    parser.add_argument("replay", help="file written with curses_tetris.py --record")
+    parser.add_argument("--frame", type=int, help="stop after this many recorded actions")
+    args = parser.parse_args()
+
+    replay = Replay.load(args.replay)
+    engine = replay.fast_forward(args.frame)
+    frame = len(replay.events) if args.frame is None else min(args.frame, len(replay.events))
+    print(f"Seed: {replay.seed} ({replay.mode})")
+    print(f"Frame: {frame}/{len(replay.events)}")
+    print(f"Score: {engine.score}  Lines: {engine.lines_cleared}  Game over: {engine.over}")
+
+
+if __name__=="__main__":
+    main()
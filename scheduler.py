@@ -0,0 +1,94 @@
+import heapq
+import itertools
+import time
+
+
+class Scheduler:
+    def __init__(self, clock=time.monotonic):
+        """ Initializes the Scheduler Object
+        A queue of callbacks ordered by the time they are due, run from a single game loop.
+
+        Scheduler Object will have:
+        - the clock it reads the current time from
+        - a heap of [deadline, order, callback, args] entries as queue
+        - a counter so that callbacks due at the same time run in the order they were scheduled
+
+        Args:
+            clock (callable, optional): returns the current time in seconds. Defaults to time.monotonic.
+        """
+        self.clock = clock
+        self.queue = []
+        self.counter = itertools.count()
+
+
+    def call_at(self, deadline, callback, *args):
+        """ Schedules a callback to run once the clock reaches the deadline
+
+        Args:
+            deadline (float): the time at which the callback is due
+            callback (callable): the function to call
+            *args: the arguments to call the function with
+
+        Returns:
+            list: the queue entry, which can be given to cancel
+        """
+        entry = [deadline, next(self.counter), callback, args]
+        heapq.heappush(self.queue, entry)
+        return entry
+
+
+    def call_later(self, delay, callback, *args):
+        """ Schedules a callback to run after the given delay
+
+        Args:
+            delay (float): the number of seconds from now after which the callback is due
+            callback (callable): the function to call
+            *args: the arguments to call the function with
+
+        Returns:
+            list: the queue entry, which can be given to cancel
+        """
+        return self.call_at(self.clock() + delay, callback, *args)
+
+
+    def cancel(self, entry):
+        """ Stops a scheduled callback from running
+        The entry stays in the queue and is discarded when it reaches the front.
+
+        Args:
+            entry (list): the entry returned by call_at or call_later
+        """
+        entry[2] = None
+
+
+    def next_deadline(self):
+        """ Gets the time at which the next callback is due
+
+        Returns:
+            float: the deadline of the next callback, or None if nothing is scheduled
+        """
+        while self.queue and self.queue[0][2] is None:
+            heapq.heappop(self.queue)
+        if self.queue:
+            return self.queue[0][0]
+        return None
+
+
+    def run_due(self, now=None):
+        """ Runs every callback whose deadline has been reached, in order of their deadlines
+
+        Args:
+            now (float, optional): the current time. Defaults to reading the clock.
+
+        Returns:
+            int: the number of callbacks that were run
+        """
+        if now is None:
+            now = self.clock()
+        ran = 0
+        while self.queue and self.queue[0][0] <= now:
+            _, _, callback, args = heapq.heappop(self.queue)
+            if callback is not None:
+                callback(*args)
+                ran += 1
+        return ran
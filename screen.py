@@ -0,0 +1,318 @@
+import os
+import select
+import shutil
+import sys
+from collections import deque
+
+# Key codes returned by getch for the arrow keys, the values curses uses so every backend returns the same codes
+KEY_DOWN, KEY_UP, KEY_LEFT, KEY_RIGHT = 258, 259, 260, 261
+
+# Escape sequences sent by the terminal for the arrow keys, in normal and application cursor mode
+ESCAPE_KEYS = {b"\x1b[A": KEY_UP, b"\x1b[B": KEY_DOWN, b"\x1b[C": KEY_RIGHT, b"\x1b[D": KEY_LEFT,
+               b"\x1bOA": KEY_UP, b"\x1bOB": KEY_DOWN, b"\x1bOC": KEY_RIGHT, b"\x1bOD": KEY_LEFT}
+
+# Escape sequences written by AnsiScreen
+ENTER_SCREEN = "\x1b[?1049h\x1b[?25l\x1b[2J"
+LEAVE_SCREEN = "\x1b[?25h\x1b[?1049l"
+MOVE_CURSOR = "\x1b[{};{}H"
+
+# Box drawing characters of AnsiWindow.box, the ones curses draws with by default
+BOX_HORIZONTAL, BOX_VERTICAL = "─", "│"
+BOX_TOP_LEFT, BOX_TOP_RIGHT, BOX_BOTTOM_LEFT, BOX_BOTTOM_RIGHT = "┌", "┐", "└", "┘"
+
+CURSES, ANSI = "curses", "ansi"
+BACKENDS = (CURSES, ANSI)
+
+
+class ScreenError(Exception):
+    """Raised when a window does not fit on the terminal"""
+
+
+class CursesScreen:
+    def __init__(self):
+        """ Initializes the CursesScreen Object
+        The terminal driven by curses (windows-curses on Windows).
+        Its windows are plain curses windows, drawn with addstr, box and erase and staged with noutrefresh.
+
+        Using curses:
+        - block the keyboard input and cursor from displaying on the terminal
+        """
+        import curses
+        self.curses = curses
+        self.root = curses.initscr()
+        curses.noecho()
+        self.root.keypad(True)
+        curses.curs_set(0)
+
+
+    def subwin(self, height, width, y, x):
+        """ Creates a window on part of the screen
+
+        Args:
+            height (int): the number of rows of the window
+            width (int): the number of columns of the window
+            y (int): the row of the top left corner of the window
+            x (int): the column of the top left corner of the window
+
+        Returns:
+            window: the curses window
+        """
+        try:
+            return self.root.subwin(height, width, y, x)
+        except self.curses.error:
+            raise ScreenError(f"A {width}x{height} window at ({x}, {y}) does not fit on the terminal")
+
+
+    def getch(self, timeout):
+        """ Waits for a key
+
+        Args:
+            timeout (int): the most milliseconds to wait, -1 to wait until a key is pressed
+
+        Returns:
+            int: the code of the key, -1 if no key was pressed in time
+        """
+        self.root.timeout(timeout)
+        return self.root.getch()
+
+
+    def ungetch(self, key):
+        """ Pushes a key back, to be returned by the next getch (last in, first out, like curses.ungetch)
+
+        Args:
+            key (int): the code of the key
+        """
+        self.curses.ungetch(key)
+
+
+    def doupdate(self):
+        """ Sends everything staged with noutrefresh to the terminal
+        """
+        self.curses.doupdate()
+
+
+    def close(self):
+        """ Gives the terminal back to the shell
+        """
+        self.curses.endwin()
+
+
+class AnsiWindow:
+    def __init__(self, screen, height, width, y, x):
+        """ Initializes the AnsiWindow Object
+        A part of an AnsiScreen with the few curses window functions the game draws with.
+        Like a curses subwin it shares the cells of the screen, so drawing on it changes the screen directly.
+
+        Args:
+            screen (AnsiScreen): the screen the window is on
+            height (int): the number of rows of the window
+            width (int): the number of columns of the window
+            y (int): the row of the top left corner of the window
+            x (int): the column of the top left corner of the window
+        """
+        self.screen = screen
+        self.height = height
+        self.width = width
+        self.y = y
+        self.x = x
+
+
+    def addstr(self, y, x, text):
+        """ Writes a string in the window, cut at its right edge
+
+        Args:
+            y (int): the row in the window
+            x (int): the column in the window
+            text (str): the characters to write, each one taking 1 column
+        """
+        self.screen.write(self.y + y, self.x + x, text[:self.width - x])
+
+
+    def box(self):
+        """ Draws a border around the edges of the window
+        """
+        inside = self.width - 2
+        self.addstr(0, 0, BOX_TOP_LEFT + BOX_HORIZONTAL * inside + BOX_TOP_RIGHT)
+        for y in range(1, self.height - 1):
+            self.addstr(y, 0, BOX_VERTICAL)
+            self.addstr(y, self.width - 1, BOX_VERTICAL)
+        self.addstr(self.height - 1, 0, BOX_BOTTOM_LEFT + BOX_HORIZONTAL * inside + BOX_BOTTOM_RIGHT)
+
+
+    def erase(self):
+        """ Blanks every cell of the window
+        """
+        for y in range(self.height):
+            self.addstr(y, 0, " " * self.width)
+
+
+    def noutrefresh(self):
+        """ Does nothing: the window draws straight onto its screen, which the next doupdate sends
+        """
+
+
+class AnsiScreen:
+    def __init__(self, fd_in=None, fd_out=None):
+        """ Initializes the AnsiScreen Object
+        The terminal driven with raw ANSI escape sequences, for terminals without curses (needs termios, so not Windows).
+        The cells drawn since the last update are compared with the cells on the terminal, and only the changed ones
+        are sent with one os.write per frame. Keys are read from stdin with select, without waiting for Enter.
+
+        AnsiScreen Object will have:
+        - the file descriptors of the keyboard and the terminal and the terminal settings to restore
+        - the size of the terminal
+        - the cells as drawn and the cells as shown on the terminal, and the rows drawn on since the last update
+        - the keys read but not returned yet
+
+        Args:
+            fd_in (int, optional): the file descriptor keys are read from. Defaults to stdin.
+            fd_out (int, optional): the file descriptor the screen is written to. Defaults to stdout.
+        """
+        import termios
+        import tty
+        self.termios = termios
+        self.fd_in = sys.stdin.fileno() if fd_in is None else fd_in
+        self.fd_out = sys.stdout.fileno() if fd_out is None else fd_out
+        self.settings = termios.tcgetattr(self.fd_in)
+        tty.setcbreak(self.fd_in)
+
+        self.width, self.height = shutil.get_terminal_size()
+        self.cells = [[" "] * self.width for _ in range(self.height)]
+        self.shown = [row.copy() for row in self.cells]
+        self.dirty = set()
+        self.keys = deque()
+        self.root = AnsiWindow(self, self.height, self.width, 0, 0)
+        os.write(self.fd_out, ENTER_SCREEN.encode())
+
+
+    def subwin(self, height, width, y, x):
+        """ Creates a window on part of the screen
+
+        Args:
+            height (int): the number of rows of the window
+            width (int): the number of columns of the window
+            y (int): the row of the top left corner of the window
+            x (int): the column of the top left corner of the window
+
+        Returns:
+            AnsiWindow: the window
+        """
+        if y + height > self.height or x + width > self.width:
+            raise ScreenError(f"A {width}x{height} window at ({x}, {y}) does not fit on the terminal")
+        return AnsiWindow(self, height, width, y, x)
+
+
+    def write(self, y, x, text):
+        """ Draws characters into the cells of the screen, dropping the ones outside of it
+
+        Args:
+            y (int): the row of the first character
+            x (int): the column of the first character
+            text (str): the characters to draw
+        """
+        if y >= self.height:
+            return
+        text = text[:self.width - x]
+        self.cells[y][x:x + len(text)] = text
+        self.dirty.add(y)
+
+
+    def doupdate(self):
+        """ Sends the cells that changed since the last update to the terminal, in a single write
+        Every run of changed cells costs one cursor move and its characters.
+        """
+        out = []
+        for y in sorted(self.dirty):
+            row, shown = self.cells[y], self.shown[y]
+            x = 0
+            while x < self.width:
+                if row[x] == shown[x]:
+                    x += 1
+                    continue
+                start = x
+                while x < self.width and row[x] != shown[x]:
+                    x += 1
+                out.append(MOVE_CURSOR.format(y + 1, start + 1))
+                out.append("".join(row[start:x]))
+                shown[start:x] = row[start:x]
+        self.dirty.clear()
+        if out:
+            os.write(self.fd_out, "".join(out).encode())
+
+
+    def getch(self, timeout):
+        """ Waits for a key
+
+        Args:
+            timeout (int): the most milliseconds to wait, -1 to wait until a key is pressed
+
+        Returns:
+            int: the code of the key, -1 if no key was pressed in time
+        """
+        if not self.keys:
+            ready, _, _ = select.select([self.fd_in], [], [], None if timeout < 0 else timeout / 1000)
+            if ready:
+                self.read_keys(os.read(self.fd_in, 64))
+        return self.keys.popleft() if self.keys else -1
+
+
+    def read_keys(self, data):
+        """ Splits the bytes read from the keyboard into key codes
+
+        Args:
+            data (bytes): the bytes read
+        """
+        i = 0
+        while i < len(data):
+            sequence = data[i:i + 3]
+            if sequence in ESCAPE_KEYS:
+                self.keys.append(ESCAPE_KEYS[sequence])
+                i += 3
+            else:
+                self.keys.append(data[i])
+                i += 1
+
+
+    def ungetch(self, key):
+        """ Queues a key, returned by getch after the keys queued before it
+
+        Args:
+            key (int): the code of the key
+        """
+        self.keys.append(key)
+
+
+    def close(self):
+        """ Gives the terminal back to the shell
+        """
+        os.write(self.fd_out, LEAVE_SCREEN.encode())
+        self.termios.tcsetattr(self.fd_in, self.termios.TCSADRAIN, self.settings)
+
+
+def default_backend():
+    """Picks curses when it is installed, and the ANSI backend otherwise
+
+    Returns:
+        str: CURSES or ANSI
+    """
+    try:
+        import curses
+    except ImportError:
+        return ANSI
+    return CURSES
+
+
+def create_screen(backend=None):
+    """Takes over the terminal with a backend
+
+    Args:
+        backend (str, optional): CURSES or ANSI. Defaults to default_backend().
+
+    Returns:
+        CursesScreen or AnsiScreen: the screen
+    """
+    if backend is None:
+        backend = default_backend()
+    if backend == ANSI:
+        return AnsiScreen()
+    return CursesScreen()
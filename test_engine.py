@@ -0,0 +1,214 @@
+import random
+import unittest
+
+from engine import Engine, PieceSource, Surface, ACTIONS, NOOP, UNIFORM, BAG, GAME_WIDTH, GAME_HEIGHT, FULL_ROW
+from bot import Bot
+from replay import Recorder, Replay, write_varint, read_varint, MAGIC, VERSION, ACTION_MASK
+
+try:
+    import numpy as np
+    from batch_engine import BatchEngine
+except ImportError: # BatchEngine needs NumPy
+    np = None
+
+# Relative weights of the random actions, in the order of ACTIONS: mostly moves and drops, so lines get cleared
+ACTION_WEIGHTS = [1, 3, 3, 2, 2, 3, 2, 1, 4]
+
+
+def measure(rows):
+    """Measures the heights and holes of every column by walking down each column, independently of Surface
+
+    Args:
+        rows (tuple of ints): the row bitmasks of the board
+
+    Returns:
+        tuple: the heights and the holes of every column, as tuples
+    """
+    heights, holes = [], []
+    for column in range(GAME_WIDTH):
+        filled = [y for y in range(GAME_HEIGHT) if rows[y] >> column & 1]
+        top = filled[0] if filled else GAME_HEIGHT
+        heights.append(GAME_HEIGHT - top)
+        holes.append(GAME_HEIGHT - top - len(filled))
+    return tuple(heights), tuple(holes)
+
+
+def fill_bottom(engine, rng):
+    """Fills the bottom half of a game not started yet with rows missing a single unit, so lines can be cleared early on
+
+    Args:
+        engine (Engine): the game
+        rng (random.Random): picks the missing unit of every row
+
+    Returns:
+        list of ints: the row bitmasks of the board
+    """
+    rows = [0] * GAME_HEIGHT
+    for y in range(GAME_HEIGHT // 2, GAME_HEIGHT):
+        rows[y] = FULL_ROW & ~(1 << rng.randrange(GAME_WIDTH))
+    engine.blocks = tuple(rows)
+    engine.surface = Surface(engine.blocks)
+    return rows
+
+
+def bot_actions(bot, engine, plans):
+    """Gets the next action of the bot in a game, planning the current block when the last plan ran out
+
+    Args:
+        bot (Bot): the player
+        engine (Engine): the game
+        plans (list of ints): the actions left in the plan of the game, consumed in place
+
+    Returns:
+        int: the action to apply, NOOP once the game is over
+    """
+    if engine.over:
+        return NOOP
+    if not plans:
+        plans.extend(bot.plan(engine))
+    return plans.pop(0)
+
+
+class SurfaceTest(unittest.TestCase):
+    def assert_surface(self, engine):
+        """Checks the surface kept up to date by the engine against a full rescan of its board"""
+        self.assertEqual((engine.surface.heights, engine.surface.holes), measure(engine.blocks))
+
+
+    def test_random_actions(self):
+        for game in range(20):
+            engine = Engine(PieceSource(game, BAG if game % 2 else UNIFORM))
+            engine.start()
+            rng = random.Random(game)
+            for _ in range(2000):
+                engine.step(rng.choices(ACTIONS, ACTION_WEIGHTS)[0])
+                self.assert_surface(engine)
+                if engine.over:
+                    break
+
+
+    def test_bot_games(self):
+        bot = Bot(lookahead=False)
+        for game in range(3):
+            engine = Engine(PieceSource(game))
+            engine.start()
+            for _ in range(150):
+                for action in bot.plan(engine):
+                    engine.step(action)
+                    self.assert_surface(engine)
+                if engine.over:
+                    break
+            self.assertGreater(engine.lines_cleared, 0)
+
+
+class ReplayTest(unittest.TestCase):
+    def test_round_trip(self):
+        bot = Bot(lookahead=False)
+        for seed, mode in ((0, UNIFORM), (7, BAG), (300, UNIFORM)):
+            now = [0.0]
+            piece_source = PieceSource(seed, mode)
+            engine = Engine(piece_source)
+            recorder = Recorder(piece_source, clock=lambda: now[0])
+            engine.start()
+            recorder.start()
+            rng = random.Random(seed)
+            plans = []
+            times = []
+            for _ in range(1500):
+                # mostly short gaps, with a few long pauses so the gaps take 1 to 3 varint bytes
+                delay = rng.choice((0, 5, 16, 200, 70000)) + rng.randrange(5)
+                now[0] += delay / 1000
+                times.append(times[-1] + delay if times else delay)
+                # the bot keeps the game going and clearing lines, with a few random actions thrown in
+                if rng.random() < 0.05:
+                    action = rng.choice(ACTIONS)
+                    plans.clear()
+                else:
+                    action = bot_actions(bot, engine, plans)
+                engine.step(action)
+                recorder.record(action)
+                if engine.over:
+                    break
+            self.assertGreater(engine.lines_cleared, 0)
+
+            replay = Replay.from_bytes(recorder.to_bytes())
+            self.assertEqual((replay.seed, replay.mode), (seed, mode))
+            self.assertEqual([time_ms for time_ms, _ in replay.events], times)
+            replayed = replay.fast_forward()
+            self.assertEqual(replayed.blocks, engine.blocks)
+            self.assertEqual((replayed.score, replayed.lines_cleared, replayed.over), (engine.score, engine.lines_cleared, engine.over))
+
+
+    def test_varints(self):
+        for value, size in ((0, 1), (127, 1), (128, 2), (16383, 2), (16384, 3), (1 << 35, 6)):
+            buffer = bytearray(b"x")
+            write_varint(buffer, value)
+            self.assertEqual(len(buffer), 1 + size)
+            self.assertEqual(read_varint(bytes(buffer), 1), (value, len(buffer)))
+        with self.assertRaises(ValueError):
+            read_varint(b"\xff\x80", 0)
+
+
+    def test_header_errors(self):
+        header = MAGIC + bytes((VERSION, 0))
+        for data in (b"", MAGIC[:2], MAGIC, b"PTRX" + bytes((VERSION, 0, 0)), MAGIC + bytes((VERSION + 1, 0, 0)),
+                     MAGIC + bytes((VERSION, 9, 0)), header, header + b"\x80", header + bytes((0, ACTION_MASK))):
+            with self.assertRaises(ValueError):
+                Replay.from_bytes(data)
+
+
+@unittest.skipIf(np is None, "BatchEngine needs NumPy")
+class BatchEngineTest(unittest.TestCase):
+    def assert_same_games(self, batch, engines):
+        """Checks every game of a BatchEngine against the Engine playing it"""
+        for game, engine in enumerate(engines):
+            self.assertEqual(tuple(int(row) for row in batch.blocks[game]), engine.blocks)
+            self.assertEqual((bool(batch.over[game]), int(batch.score[game]), int(batch.lines_cleared[game])),
+                             (engine.over, engine.score, engine.lines_cleared))
+            self.assertAlmostEqual(float(batch.timing[game]), engine.timing)
+            if not engine.over:
+                block = engine.current_block
+                self.assertEqual((int(batch.block_type[game]), int(batch.rotation[game]), int(batch.x[game]), int(batch.y[game])),
+                                 (block.block_type, block.rotation, block.x, block.y))
+                self.assertEqual(int(batch.next_type[game]), engine.next_block.block_type)
+
+
+    def test_random_actions(self):
+        games, seed = 50, 10
+        batch = BatchEngine(games, seed, BAG)
+        engines = [Engine(PieceSource(seed + game, BAG)) for game in range(games)]
+        rng = random.Random(1)
+        for game, engine in enumerate(engines):
+            batch.blocks[game] = fill_bottom(engine, rng)
+        batch.start()
+        for engine in engines:
+            engine.start()
+        for _ in range(500):
+            actions = rng.choices(ACTIONS, ACTION_WEIGHTS, k=games)
+            batch.step(np.array(actions))
+            for engine, action in zip(engines, actions):
+                engine.step(action)
+            self.assert_same_games(batch, engines)
+        self.assertGreater(int(batch.lines_cleared.sum()), 0)
+
+
+    def test_bot_games(self):
+        games = 4
+        bot = Bot(lookahead=False)
+        batch = BatchEngine(games)
+        engines = [Engine(PieceSource(game)) for game in range(games)]
+        plans = [[] for _ in range(games)]
+        batch.start()
+        for engine in engines:
+            engine.start()
+        for _ in range(1500):
+            actions = [bot_actions(bot, engine, plan) for engine, plan in zip(engines, plans)]
+            batch.step(np.array(actions))
+            for engine, action in zip(engines, actions):
+                engine.step(action)
+            self.assert_same_games(batch, engines)
+        self.assertGreater(int(batch.lines_cleared.min()), 0)
+
+
+if __name__=="__main__":
+    unittest.main()
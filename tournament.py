@@ -0,0 +1,158 @@
+import argparse
+import json
+import multiprocessing
+import os
+import statistics
+import time
+
+from engine import UNIFORM, BAG
+from bot import Bot, WEIGHTS, play_game
+from curses_tetris import positive_int
+
+# Weight sets played against each other when no strategy file is given
+STRATEGIES = {"default": WEIGHTS,
+              "flat": {"height": -0.8, "lines": 0.5, "holes": -0.35663, "bumpiness": -0.184483},
+              "no_holes": {"height": -0.510066, "lines": 0.760666, "holes": -0.7, "bumpiness": -0.184483},
+              "smooth": {"height": -0.510066, "lines": 0.760666, "holes": -0.35663, "bumpiness": -0.4}}
+
+
+def play_match(task):
+    """Plays one game of a strategy, run by the workers of the pool
+
+    Args:
+        task (tuple): the name and weights of the strategy, the seed, the mode of the PieceSource
+        and the number of blocks after which the game is stopped
+
+    Returns:
+        dict: the strategy, seed, score, lines cleared, blocks played, final gravity interval,
+        whether the game was over, the seconds it took and the process that played it
+    """
+    name, weights, seed, mode, max_pieces = task
+    start = time.perf_counter()
+    engine, pieces = play_game(Bot(weights), seed, mode, max_pieces)
+    return {"strategy": name,
+            "seed": seed,
+            "score": engine.score,
+            "lines": engine.lines_cleared,
+            "pieces": pieces,
+            "timing": engine.timing,
+            "over": engine.over,
+            "seconds": time.perf_counter() - start,
+            "worker": os.getpid()}
+
+
+def summarize(values):
+    """Describes the distribution of a list of numbers
+
+    Args:
+        values (list of numbers): the numbers
+
+    Returns:
+        dict: the mean, standard deviation, min, quartiles and max of the numbers
+    """
+    quartiles = statistics.quantiles(values, n=4) if len(values) > 1 else [values[0]] * 3
+    return {"mean": statistics.fmean(values),
+            "stdev": statistics.pstdev(values),
+            "min": min(values),
+            "p25": quartiles[0],
+            "median": quartiles[1],
+            "p75": quartiles[2],
+            "max": max(values)}
+
+
+def run(strategies, games, seed=0, mode=UNIFORM, max_pieces=None, processes=None):
+    """Plays the same seeded games with every strategy, spread over a process pool
+
+    Args:
+        strategies (dict): the name of every strategy mapped to its weights
+        games (int): the number of games per strategy, game i using seed + i
+        seed (int, optional): the seed of the first game. Defaults to 0.
+        mode (str, optional): the mode of the PieceSources. Defaults to UNIFORM.
+        max_pieces (int, optional): the number of blocks after which a game is stopped. Defaults to None.
+        processes (int, optional): the number of workers. Defaults to the number of CPU cores.
+
+    Returns:
+        dict: the settings, the wall time, the results of every game and their summary per strategy and per worker
+    """
+    tasks = [(name, weights, seed + game, mode, max_pieces)
+             for game in range(games) for name, weights in strategies.items()]
+    start = time.perf_counter()
+    with multiprocessing.Pool(processes) as pool:
+        results = list(pool.imap_unordered(play_match, tasks))
+    elapsed = time.perf_counter() - start
+    results.sort(key=lambda result: (result["strategy"], result["seed"]))
+
+    summary = {}
+    for name in strategies:
+        played = [result for result in results if result["strategy"] == name]
+        summary[name] = {"games": len(played),
+                         "score": summarize([result["score"] for result in played]),
+                         "lines": summarize([result["lines"] for result in played]),
+                         "game_overs": sum(result["over"] for result in played),
+                         "seconds": sum(result["seconds"] for result in played)}
+    workers = {}
+    for result in results:
+        worker = workers.setdefault(result["worker"], {"games": 0, "seconds": 0.0})
+        worker["games"] += 1
+        worker["seconds"] += result["seconds"]
+    return {"games": games,
+            "seed": seed,
+            "mode": mode,
+            "max_pieces": max_pieces,
+            "processes": processes or os.cpu_count(),
+            "elapsed": elapsed,
+            "games_per_sec": len(results) / elapsed,
+            "strategies": summary,
+            "workers": workers,
+            "results": results}
+
+
+def print_report(report):
+    """Prints the summary of a tournament as tables
+
+    Args:
+        report (dict): the tournament returned by run
+    """
+    print(f"{'strategy':<16}{'games':>6}{'score mean':>12}{'median':>9}{'min':>7}{'max':>7}"
+          f"{'lines mean':>12}{'overs':>7}{'sec/game':>10}")
+    ranking = sorted(report["strategies"].items(), key=lambda item: -item[1]["score"]["mean"])
+    for name, summary in ranking:
+        score = summary["score"]
+        print(f"{name:<16}{summary['games']:>6}{score['mean']:>12,.1f}{score['median']:>9,.0f}{score['min']:>7,}"
+              f"{score['max']:>7,}{summary['lines']['mean']:>12,.1f}{summary['game_overs']:>7}"
+              f"{summary['seconds'] / summary['games']:>10.2f}")
+    print()
+    print(f"{'worker':<10}{'games':>6}{'busy sec':>10}")
+    for worker, timing in sorted(report["workers"].items()):
+        print(f"{worker:<10}{timing['games']:>6}{timing['seconds']:>10.2f}")
+    print()
+    print(f"{len(report['results'])} games in {report['elapsed']:.2f}s on {report['processes']} processes "
+          f"({report['games_per_sec']:.2f} games/sec)")
+
+
+def main():
+    """Plays a tournament between weight sets of the bot and prints or saves the results
+    """
+    parser = argparse.ArgumentParser(description="Compare weight sets of the bot over many seeded games")
+    parser.add_argument("--games", type=positive_int, default=20, help="games per strategy (default: 20)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game (default: 0)")
+    parser.add_argument("--bag", action="store_true", help="deal the blocks from shuffled bags of all 7 shapes")
+    parser.add_argument("--max-pieces", type=int, help="stop every game after this many blocks (default: no limit)")
+    parser.add_argument("--processes", type=positive_int, help="number of workers (default: number of CPU cores)")
+    parser.add_argument("--strategies", metavar="FILE", help="JSON file mapping strategy names to weights")
+    parser.add_argument("--output", metavar="FILE", help="save the results as JSON to FILE")
+    args = parser.parse_args()
+
+    strategies = STRATEGIES
+    if args.strategies:
+        with open(args.strategies) as file:
+            strategies = json.load(file)
+    report = run(strategies, args.games, args.seed, BAG if args.bag else UNIFORM, args.max_pieces, args.processes)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__=="__main__":
+    main()